@@ -3,41 +3,45 @@ Command-line interface for architect.
 
 This module handles argument parsing and orchestrates the disk preparation process.
 """
-import argparse
 import logging
 import os
 import sys
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, TYPE_CHECKING
 
-from architect.utils.logging import setup_logging
+from architect import __version__
+
+from architect.utils.logging import flush_logging, setup_logging
 from architect.utils.command import CommandRunner, SimulationMode, TermColors
 from architect.utils.format import bytes_to_human_readable
-from architect.utils.validation import check_prerequisites, normalize_encryption_args, validate_encryption_requirements
-from architect.core.disk import get_disk_info, is_disk_available
-from architect.core.partition import prepare_disk
-from architect.core.encryption import setup_encryption
-from architect.core.filesystem import create_filesystems, create_btrfs_subvolumes
-from architect.core.mount import determine_mount_options, mount_filesystems
-from architect.config.fstab import generate_fstab
-from architect.config.crypttab import generate_crypttab
+from architect.core.probe import probe_system
 from architect.core.exceptions import (
     DiskNotFoundError, NotEnoughSpaceError, PartitioningError, 
     EncryptionError, FilesystemError, MountError, FstabError, CrypttabError
 )
 
+if TYPE_CHECKING:
+    import argparse
+
 logger = logging.getLogger('architect')
 
 # Constants
 DEFAULT_TARGET = "/target"
 
 
-def parse_arguments() -> argparse.Namespace:
+def parse_arguments() -> "argparse.Namespace":
     """
     Parse command-line arguments.
     
     Returns:
         Namespace containing parsed arguments
     """
+    # Answer a bare version query without building the whole parser
+    if len(sys.argv) == 2 and sys.argv[1] in ("--version", "-V"):
+        print(f"architect {__version__}")
+        sys.exit(0)
+    
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description="Disk preparation and partitioning tool for secure Linux installation"
     )
@@ -166,6 +170,12 @@ def parse_arguments() -> argparse.Namespace:
         help="Use characteristics of the real disk, even in simulation mode"
     )
     
+    parser.add_argument(
+        "-V", "--version",
+        action="version",
+        version=f"architect {__version__}"
+    )
+    
     parser.add_argument(
         "--debug",
         action="store_true", 
@@ -181,7 +191,7 @@ def parse_arguments() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def display_simulation_summary(args: argparse.Namespace, cmd_runner: CommandRunner) -> None:
+def display_simulation_summary(args: "argparse.Namespace", cmd_runner: CommandRunner) -> None:
     """
     Display a summary of the simulation.
     
@@ -189,43 +199,79 @@ def display_simulation_summary(args: argparse.Namespace, cmd_runner: CommandRunn
         args: Command line arguments
         cmd_runner: CommandRunner instance for executing commands
     """
-    if cmd_runner.simulation_mode != SimulationMode.SIMULATE:
+    if not cmd_runner.simulating:
         return
     
     # Get the simulation report
     report = cmd_runner.get_simulation_report()
     
-    # Get terminal width
-    try:
-        terminal_width = os.get_terminal_size().columns
-    except (AttributeError, OSError):
-        terminal_width = 80
+    # Get terminal width (only query the terminal when stdout is one)
+    terminal_width = 80
+    if sys.stdout.isatty():
+        try:
+            terminal_width = os.get_terminal_size().columns
+        except (AttributeError, OSError):
+            pass
     
     # Add a line of stars
     stars = "*" * terminal_width
     
-    # Import TermColors from format
-    from architect.utils.format import TermColors, colorize
+    # Print the report with decorations (color sequences are empty when colors are disabled)
+    sim, success, reset = cmd_runner.color_sim, cmd_runner.color_success, cmd_runner.color_reset
+    bold = TermColors.BOLD if cmd_runner.colored_output else ""
     
-    # Print the report with decorations
-    if cmd_runner.colored_output:
-        print(f"\n{colorize(stars, TermColors.SIM)}")
-        print(colorize(f"SIMULATION COMPLETE - NO CHANGES WERE MADE", TermColors.SIM + TermColors.BOLD))
-        print(f"{colorize(stars, TermColors.SIM)}\n")
-        
-        print(colorize("The following operations would have been performed:", TermColors.SUCCESS))
-        print(report)
-        
-        print(f"\n{colorize('To execute these operations for real, run without the --simulate flag.', TermColors.SIM)}")
-    else:
-        print(f"\n{stars}")
-        print("SIMULATION COMPLETE - NO CHANGES WERE MADE")
-        print(f"{stars}\n")
-        
-        print("The following operations would have been performed:")
-        print(report)
+    # Let the pending log messages out before the report
+    flush_logging()
+    
+    print(f"\n{sim}{stars}{reset}")
+    print(f"{sim}{bold}SIMULATION COMPLETE - NO CHANGES WERE MADE{reset}")
+    print(f"{sim}{stars}{reset}\n")
+    
+    print(f"{success}The following operations would have been performed:{reset}")
+    print(report)
+    
+    print(f"\n{sim}To execute these operations for real, run without the --simulate flag.{reset}")
+
+
+def encrypt_and_create_filesystems(
+    partitions: Dict[str, str], 
+    disk_info: Dict[str, Any], 
+    args: "argparse.Namespace", 
+    cmd_runner: CommandRunner
+) -> Dict[str, str]:
+    """
+    Encrypt the system partition and create all filesystems.
+    The EFI and boot filesystems do not depend on the encrypted container,
+    so they are created while the (slow) LUKS key derivation runs.
+    
+    Args:
+        partitions: Dict mapping partition roles to device paths
+        disk_info: Dict containing disk info
+        args: Command line arguments
+        cmd_runner: CommandRunner instance for executing commands
         
-        print("\nTo execute these operations for real, run without the --simulate flag.")
+    Returns:
+        Updated partitions dict with encrypted device path
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from architect.core.encryption import setup_encryption
+    from architect.core.filesystem import create_filesystems
+    
+    # In simulation mode, keep the output in order
+    if cmd_runner.simulating:
+        partitions = setup_encryption(args.disk, partitions, args, cmd_runner)
+        create_filesystems(partitions, disk_info, args, cmd_runner)
+        return partitions
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        plain_filesystems = executor.submit(
+            create_filesystems, partitions, disk_info, args, cmd_runner, ("efi", "boot")
+        )
+        partitions = setup_encryption(args.disk, partitions, args, cmd_runner)
+        plain_filesystems.result()
+    
+    create_filesystems(partitions, disk_info, args, cmd_runner, ("system",))
+    return partitions
 
 
 def main() -> int:
@@ -275,34 +321,10 @@ def main() -> int:
             if args.sim_use_real:
                 logger.info("Using characteristics of real disk even in simulation mode")
         
-        # Check prerequisites
-        try:
-            # Pass the use_real_disk_info flag to check_prerequisites
-            check_prerequisites(cmd_runner, args.sim_use_real if args.simulate else False)
-        except RuntimeError as e:
-            logger.error(str(e))
-            return 1
-            
-        # Normalize encryption arguments
-        normalize_encryption_args(args)
-        
-        # Validate encryption requirements
-        try:
-            validate_encryption_requirements(args, cmd_runner)
-        except EncryptionError as e:
-            logger.error(str(e))
-            return 1
-            
-        # Get disk info
+        # Check prerequisites, encryption requirements and get disk info
         try:
-            disk_info = get_disk_info(args.disk, cmd_runner)
-            
-            # Force TRIM support if requested and disk is SSD
-            if args.force_discard and not disk_info["rotational"]:
-                logger.info("Forcing TRIM/discard support as requested by --force-discard")
-                disk_info["trim_supported"] = True
-                
-        except DiskNotFoundError as e:
+            disk_info = probe_system(args, cmd_runner)
+        except (RuntimeError, EncryptionError, DiskNotFoundError) as e:
             logger.error(str(e))
             return 1
             
@@ -316,6 +338,14 @@ def main() -> int:
             logger.info(f"TRIM support: {'Yes' if disk_info.get('trim_supported', False) else 'Not detected'}")
         logger.info("")
         
+        # Import the workflow modules only once the system has been probed
+        from architect.core.partition import prepare_disk
+        from architect.core.encryption import reset_opal_drive
+        from architect.core.filesystem import create_filesystems, create_btrfs_subvolumes
+        from architect.core.mount import determine_mount_options, mount_filesystems
+        from architect.config.fstab import generate_fstab
+        from architect.config.crypttab import generate_crypttab
+        
         # Execute main workflow
         try:
             # CHANGEMENT: Si reset Opal est nécessaire, le faire avant de préparer le disque
@@ -324,19 +354,17 @@ def main() -> int:
                 len(args.hardware_encryption) >= 1 and 
                 args.hardware_encryption[0] and 
                 args.hardware_encryption[0].lower() != "none"):
-                from architect.core.encryption import reset_opal_drive
                 logger.info("OPAL reset with PSID requested, performing reset before disk preparation")
                 reset_opal_drive(args.disk, args.hardware_encryption[0], cmd_runner)
             
             # Prepare the disk
             partitions = prepare_disk(args.disk, disk_info, args, cmd_runner)
             
-            # Set up encryption if requested
+            # Set up encryption if requested and create filesystems
             if args.hardware_encryption or args.software_encryption:
-                partitions = setup_encryption(args.disk, partitions, args, cmd_runner)
-            
-            # Create filesystems
-            create_filesystems(partitions, disk_info, args, cmd_runner)
+                partitions = encrypt_and_create_filesystems(partitions, disk_info, args, cmd_runner)
+            else:
+                create_filesystems(partitions, disk_info, args, cmd_runner)
             
             # Create btrfs subvolumes
             create_btrfs_subvolumes(partitions, args, cmd_runner)
@@ -380,6 +408,7 @@ def main() -> int:
         logger.error(f"Unexpected error: {e}")
         if 'args' in locals() and args.debug:
             import traceback
+            flush_logging()
             traceback.print_exc()
         return 1
 
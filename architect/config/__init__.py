@@ -7,7 +7,7 @@ import logging
 from pathlib import Path
 from typing import Optional
 
-from architect.utils.command import CommandRunner, SimulationMode
+from architect.utils.command import CommandRunner
 
 logger = logging.getLogger('architect')
 
@@ -27,7 +27,7 @@ def create_directory(
     """
     desc = f"{description} " if description else ""
     
-    if cmd_runner.simulation_mode == SimulationMode.SIMULATE:
+    if cmd_runner.simulating:
         logger.info(f"Would create {desc}directory: {path}")
     else:
         path.mkdir(exist_ok=True, parents=True)
@@ -9,8 +9,7 @@ import logging
 from typing import Dict, Any
 from pathlib import Path
 
-from architect.utils.command import CommandRunner, SimulationMode
-from architect.utils.format import TermColors, colorize
+from architect.utils.command import CommandRunner
 from architect.utils.types import DiskInfo, PartitionTable
 from architect.core.exceptions import CrypttabError
 from architect.config import create_etc_directory
@@ -39,20 +38,24 @@ def generate_crypttab(partitions: PartitionTable, disk_info: DiskInfo, args: Any
     etc_path = target_path / "etc"
     crypttab_path = etc_path / "crypttab"
     
+    # Bind the color sequences once for the log calls below
+    info, success, error, reset = (cmd_runner.color_info, cmd_runner.color_success,
+                                   cmd_runner.color_error, cmd_runner.color_reset)
+    
     # Create etc directory if it doesn't exist
     create_etc_directory(target_path, cmd_runner)
     
-    logger.info(colorize(f"Generating crypttab at {crypttab_path}", 
-                        TermColors.INFO, cmd_runner.colored_output))
+    logger.info("%sGenerating crypttab at %s%s", info, crypttab_path, reset)
     
     try:
-        # Get device PARTUUID for the encrypted partition
+        # Get device PARTUUID for the encrypted partition, probing the device
+        # directly rather than going through the (possibly stale) blkid cache
         try:
-            result = cmd_runner.run(["blkid", "-s", "PARTUUID", "-o", "value", partitions["system_crypt"]])
+            result = cmd_runner.run(["blkid", "-c", "/dev/null", "-s", "PARTUUID", "-o", "value", partitions["system_crypt"]])
             encrypted_partuuid = result.stdout.strip()
         except Exception as e:
-            logger.error(colorize(f"Failed to get PARTUUID for {partitions['system_crypt']}: {e}", 
-                                 TermColors.ERROR, cmd_runner.colored_output))
+            logger.error("%sFailed to get PARTUUID for %s: %s%s", 
+                         error, partitions["system_crypt"], e, reset)
             raise
             
         luks_name = os.path.basename(partitions["system"])
@@ -81,17 +84,23 @@ def generate_crypttab(partitions: PartitionTable, disk_info: DiskInfo, args: Any
         crypttab_content.append(f"{luks_name} PARTUUID={encrypted_partuuid} none {options_str}")
         
         # Write crypttab or display it in simulation mode
-        if cmd_runner.simulation_mode == SimulationMode.SIMULATE:
-            logger.info("Would write the following to crypttab:")
-            for line in crypttab_content:
-                logger.info(f"  {line}")
+        if cmd_runner.simulating:
+            logger.info("Would write the following to crypttab:\n%s", 
+                        "\n".join(f"  {line}" for line in crypttab_content))
         else:
-            with open(crypttab_path, "w") as f:
-                f.write("\n".join(crypttab_content) + "\n")
+            # Write the whole file at once and make sure it is durable, crypttab
+            # is only readable by root as it may hold sensitive options
+            crypttab_content.append("")
+            data = "\n".join(crypttab_content).encode("utf-8")
+            fd = os.open(crypttab_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            # The file object retries short writes and closes the descriptor
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
         
-        logger.info(colorize("crypttab generated successfully", 
-                            TermColors.SUCCESS, cmd_runner.colored_output))
+        logger.info("%scrypttab generated successfully%s", success, reset)
     except Exception as e:
         error_msg = f"Failed to generate crypttab: {e}"
-        logger.error(colorize(error_msg, TermColors.ERROR, cmd_runner.colored_output))
+        logger.error("%s%s%s", error, error_msg, reset)
         raise CrypttabError(error_msg)
\ No newline at end of file
@@ -4,39 +4,57 @@ fstab generation module.
 This module handles generating optimized fstab entries for the target system.
 Refactored for better readability and separation of concerns.
 """
-import os
 import logging
 from typing import Dict, Any, List
 from pathlib import Path
 
-from architect.utils.command import CommandRunner, SimulationMode
-from architect.utils.format import TermColors, colorize
+from architect.utils.command import CommandRunner
 from architect.utils.types import PartitionTable, MountOptions
 from architect.core.exceptions import FstabError
+from architect.core.mount import SUBVOLUME_MOUNTPOINTS, build_subvol_options
 from architect.config import create_etc_directory
 
 logger = logging.getLogger('architect')
 
 
-def _get_partition_identifier(partition_path: str, id_type: str, cmd_runner: CommandRunner) -> str:
+def _get_partition_identifiers(partition_paths: List[str], cmd_runner: CommandRunner) -> Dict[str, Dict[str, str]]:
     """
-    Get a partition identifier (UUID or PARTUUID) for use in fstab.
+    Get the identifiers (UUID and PARTUUID) of several partitions with a single blkid call.
     
     Args:
-        partition_path: Path to the partition device
-        id_type: Type of identifier to get ('UUID' or 'PARTUUID')
+        partition_paths: Paths to the partition devices
         cmd_runner: CommandRunner instance for executing commands
         
     Returns:
-        The partition identifier as a string
+        Dict mapping each partition path to its identifiers by type ('UUID', 'PARTUUID')
+        
+    Raises:
+        KeyError: If blkid reported nothing for one of the partitions
     """
     try:
-        result = cmd_runner.run(["blkid", "-s", id_type, "-o", "value", partition_path])
-        return result.stdout.strip()
+        # Probe the devices directly rather than going through the (possibly stale) blkid cache
+        result = cmd_runner.run(["blkid", "-c", "/dev/null", "-s", "UUID", "-s", "PARTUUID", 
+                                 "-o", "export"] + partition_paths)
     except Exception as e:
-        logger.error(colorize(f"Failed to get {id_type} for {partition_path}: {e}", 
-                             TermColors.ERROR, cmd_runner.colored_output))
+        logger.error("%sFailed to get identifiers for %s: %s%s", 
+                     cmd_runner.color_error, ", ".join(partition_paths), e, cmd_runner.color_reset)
         raise
+    
+    # The export format is one KEY=value line per tag, with a blank line between devices
+    identifiers: Dict[str, Dict[str, str]] = {}
+    for block in result.stdout.strip().split("\n\n"):
+        tags = dict(line.split("=", 1) for line in block.splitlines() if "=" in line)
+        device = tags.pop("DEVNAME", None)
+        if device is not None:
+            identifiers[device] = tags
+    
+    missing = [path for path in partition_paths if path not in identifiers]
+    if missing:
+        logger.error("%sblkid reported no identifiers for %s%s", 
+                     cmd_runner.color_error, ", ".join(missing), cmd_runner.color_reset)
+        raise KeyError(", ".join(missing))
+    
+    return identifiers
 
 
 def generate_fstab(partitions: PartitionTable, mount_options: MountOptions, args: Any, cmd_runner: CommandRunner) -> None:
@@ -63,14 +81,17 @@ def generate_fstab(partitions: PartitionTable, mount_options: MountOptions, args
     # Create etc directory if it doesn't exist
     create_etc_directory(target_path, cmd_runner)
     
-    logger.info(colorize(f"Generating fstab at {fstab_path}", 
-                        TermColors.INFO, cmd_runner.colored_output))
+    logger.info("%sGenerating fstab at %s%s", 
+                cmd_runner.color_info, fstab_path, cmd_runner.color_reset)
     
     try:
         # Get device identifiers
-        efi_partuuid = _get_partition_identifier(partitions["efi"], "PARTUUID", cmd_runner)
-        boot_partuuid = _get_partition_identifier(partitions["boot"], "PARTUUID", cmd_runner)
-        system_uuid = _get_partition_identifier(partitions["system"], "UUID", cmd_runner)
+        identifiers = _get_partition_identifiers(
+            [partitions["efi"], partitions["boot"], partitions["system"]], cmd_runner
+        )
+        efi_partuuid = identifiers[partitions["efi"]]["PARTUUID"]
+        boot_partuuid = identifiers[partitions["boot"]]["PARTUUID"]
+        system_uuid = identifiers[partitions["system"]]["UUID"]
         
         # Build fstab content
         fstab_content = []
@@ -81,32 +102,11 @@ def generate_fstab(partitions: PartitionTable, mount_options: MountOptions, args
         
         # Include LUKS device if using software encryption
         if "system_crypt" in partitions:
-            crypt_partuuid = _get_partition_identifier(partitions["system_crypt"], "PARTUUID", cmd_runner)
-            luks_name = os.path.basename(partitions["system"])
             fstab_content.append("# LUKS encrypted partition")
             fstab_content.append("")
         
-        # Define all subvolumes and mount points
-        subvolumes = {
-            # Subvolume: mount point
-            "@": "/",
-            "@home": "/home",
-            "@opt": "/opt",
-            "@root": "/root",
-            "@srv": "/srv",
-            "@tmp": "/tmp",
-            "@usr": "/usr",
-            "@var": "/var",
-            "@var_log": "/var/log",
-            "@var_tmp": "/var/tmp"
-        }
-        
         # Add root entry
-        root_options = mount_options["/"]
-        if root_options == "defaults":
-            root_options = "subvol=@"
-        else:
-            root_options = f"subvol=@,{root_options}"
+        root_options = build_subvol_options("@", mount_options["/"])
         fstab_content.append(f"UUID={system_uuid} / btrfs {root_options} 0 0")
         
         # Add boot entry
@@ -118,17 +118,8 @@ def generate_fstab(partitions: PartitionTable, mount_options: MountOptions, args
         fstab_content.append(f"PARTUUID={efi_partuuid} /boot/efi vfat {efi_options} 0 2")
         
         # Add other subvolumes
-        for subvol, mountpoint in subvolumes.items():
-            # Skip root as it's already added
-            if subvol == "@":
-                continue
-                
-            options = mount_options[mountpoint]
-            if options == "defaults":
-                options = f"subvol={subvol}"
-            else:
-                options = f"subvol={subvol},{options}"
-                
+        for subvol, mountpoint in SUBVOLUME_MOUNTPOINTS:
+            options = build_subvol_options(subvol, mount_options[mountpoint])
             fstab_content.append(f"UUID={system_uuid} {mountpoint} btrfs {options} 0 0")
         
         # Add proc with hidepid=2 if in hardened mode
@@ -138,7 +129,7 @@ def generate_fstab(partitions: PartitionTable, mount_options: MountOptions, args
             fstab_content.append("proc /proc proc hidepid=2,gid=proc 0 0")
         
         # Write fstab or display it in simulation mode
-        if cmd_runner.simulation_mode == SimulationMode.SIMULATE:
+        if cmd_runner.simulating:
             logger.info("Would write the following to fstab:")
             for line in fstab_content:
                 logger.info(f"  {line}")
@@ -146,10 +137,10 @@ def generate_fstab(partitions: PartitionTable, mount_options: MountOptions, args
             with open(fstab_path, "w") as f:
                 f.write("\n".join(fstab_content) + "\n")
         
-        logger.info(colorize("fstab generated successfully", 
-                            TermColors.SUCCESS, cmd_runner.colored_output))
+        logger.info("%sfstab generated successfully%s", 
+                    cmd_runner.color_success, cmd_runner.color_reset)
                             
     except Exception as e:
         error_msg = f"Failed to generate fstab: {e}"
-        logger.error(colorize(error_msg, TermColors.ERROR, cmd_runner.colored_output))
+        logger.error("%s%s%s", cmd_runner.color_error, error_msg, cmd_runner.color_reset)
         raise FstabError(error_msg)
\ No newline at end of file
@@ -4,18 +4,33 @@ Disk information and validation module.
 This module provides functions for querying disk information and validating
 disk availability with improved type safety and optimized code.
 """
+import fcntl
+import json
 import os
 import logging
-import shutil
-from typing import Dict, Any, Optional
+import stat
+import struct
+from typing import Dict, Any, Optional, Tuple
 
-from architect.utils.command import CommandRunner, SimulationMode
+from architect.utils.command import CommandRunner, SimulationMode, find_tool
 from architect.utils.types import DiskInfo
-from architect.utils.format import TermColors, colorize
 from architect.core.exceptions import DiskNotFoundError
 
 logger = logging.getLogger('architect')
 
+# Number of CPUs usable by this process (respects cgroup/taskset affinity limits)
+_CPU_COUNT = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 4)
+
+# lsblk columns gathered for a disk in a single query
+LSBLK_COLUMNS = "NAME,TYPE,SIZE,ROTA,MODEL,DISC-GRAN,DISC-MAX,TRAN"
+
+# ioctl request number to discard a byte range of a block device, _IO(0x12, 119)
+BLKDISCARD = 0x1277
+
+# Disk information cache, keyed by (disk, simulation mode, use real disk info,
+# simulation parameters)
+_DISK_INFO_CACHE: Dict[Tuple[str, SimulationMode, bool, Tuple[Tuple[str, Any], ...]], DiskInfo] = {}
+
 
 def read_sysfs_value(path: str, default: Optional[str] = None) -> str:
     """
@@ -28,11 +43,14 @@ def read_sysfs_value(path: str, default: Optional[str] = None) -> str:
     Returns:
         Content of the file as string or default
     """
+    # sysfs attributes are tiny, read them directly without buffered I/O
     try:
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                return f.read().strip()
-    except Exception as e:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            return os.read(fd, 4096).decode().strip()
+        finally:
+            os.close(fd)
+    except (OSError, UnicodeDecodeError) as e:
         logger.debug(f"Could not read {path}: {e}")
     
     return default or ""
@@ -40,77 +58,72 @@ def read_sysfs_value(path: str, default: Optional[str] = None) -> str:
 
 def is_disk_available(disk: str, cmd_runner: CommandRunner) -> bool:
     """
-    Check if the disk exists and is a block device.
+    Check if the disk exists and is a whole-disk block device.
     
     Args:
         disk: Path to the disk device
         cmd_runner: CommandRunner instance for executing commands
         
     Returns:
-        True if disk exists and is a block device, False otherwise
+        True if disk exists and is a block device other than a partition, False otherwise
     """
     # In pure simulation mode, assume disk is available
-    if cmd_runner.simulation_mode == SimulationMode.SIMULATE and not cmd_runner.use_real_disk_info:
+    if cmd_runner.simulating and not cmd_runner.use_real_disk_info:
         return True
         
-    # Check if disk exists
-    if not os.path.exists(disk):
-        return False
-    
+    # A single stat() tells whether the path exists and is a block device
     try:
-        # Use the appropriate command function based on mode
-        cmd_func = (cmd_runner.run_real if cmd_runner.simulation_mode == SimulationMode.SIMULATE 
-                    and cmd_runner.use_real_disk_info else cmd_runner.run)
-        
-        result = cmd_func(["lsblk", "-n", "-o", "TYPE", disk], check=False)
-        return "disk" in result.stdout.lower()
-    except Exception as e:
-        logger.warning(colorize(f"Error checking if disk is available: {e}", 
-                               TermColors.WARNING, cmd_runner.colored_output))
+        if not stat.S_ISBLK(os.stat(disk).st_mode):
+            return False
+    except OSError as e:
+        logger.debug(f"Could not stat {disk}: {e}")
         return False
+    
+    # The kernel only exposes a partition attribute for partitions
+    disk_name = os.path.basename(os.path.realpath(disk))
+    return not os.path.exists(f"/sys/class/block/{disk_name}/partition")
 
 
-def check_trim_support(disk: str, is_ssd: bool, cmd_runner: CommandRunner) -> bool:
+def check_trim_support(disk: str, cmd_runner: CommandRunner, is_nvme: Optional[bool] = None) -> bool:
     """
-    Check if the disk device supports TRIM/discard commands.
+    Check if a real non-rotational disk supports TRIM/discard commands, for when
+    lsblk could not report its discard limits.
     
     Args:
         disk: Path to the disk device
-        is_ssd: Whether the disk is an SSD/NVMe (non-rotational)
         cmd_runner: CommandRunner instance for executing commands
+        is_nvme: Whether the disk is an NVMe drive (derived from the disk name if None)
         
     Returns:
         True if TRIM is supported, False otherwise
     """
-    # If not SSD, no TRIM support
-    if not is_ssd:
-        return False
-        
+    # The kernel exposes discard limits in sysfs, a non-zero value means TRIM is
+    # supported; this avoids sending an ATA IDENTIFY through hdparm
     disk_name = os.path.basename(disk)
-    
-    # Simulation mode handling
-    if cmd_runner.simulation_mode == SimulationMode.SIMULATE:
-        if "trim_supported" in cmd_runner.simulation_params:
-            trim_supported = cmd_runner.simulation_params["trim_supported"]
-            logger.info(f"Simulation: disk configured with TRIM support: {trim_supported}")
-            return trim_supported
-        # In simulation, assume modern SSDs support TRIM
-        return True
+    discard_max = read_sysfs_value(f"/sys/block/{disk_name}/queue/discard_max_bytes")
+    if discard_max.isdigit():
+        return int(discard_max) > 0
     
     # NVMe detection - all modern NVMe drives support TRIM
-    if "nvme" in disk_name:
-        logger.info(colorize("NVMe drive detected - assuming TRIM support", 
-                             TermColors.INFO, cmd_runner.colored_output))
+    if is_nvme is None:
+        is_nvme = os.path.basename(disk).startswith("nvme")
+    if is_nvme:
+        logger.info("%sNVMe drive detected - assuming TRIM support%s", 
+                    cmd_runner.color_info, cmd_runner.color_reset)
         return True
     
-    # For SATA/other disk types, try hdparm if available
-    if shutil.which("hdparm"):
+    # For SATA/other disk types without sysfs information, try hdparm if available
+    hdparm_path = find_tool("hdparm")
+    if hdparm_path:
+        # Query the real disk even with --sim-use-real, like the lsblk probes
+        cmd_func = (cmd_runner.run_real if cmd_runner.simulating
+                    else cmd_runner.run)
         try:
-            result = cmd_runner.run(["hdparm", "-I", disk], check=False)
+            result = cmd_func([hdparm_path, "-I", disk], check=False)
             return "TRIM supported" in result.stdout
         except Exception as e:
-            logger.warning(colorize(f"Error checking TRIM support: {e}", 
-                                   TermColors.WARNING, cmd_runner.colored_output))
+            logger.warning("%sError checking TRIM support: %s%s", 
+                           cmd_runner.color_warning, e, cmd_runner.color_reset)
     else:
         logger.debug("hdparm not found for TRIM detection")
         
@@ -118,7 +131,86 @@ def check_trim_support(disk: str, is_ssd: bool, cmd_runner: CommandRunner) -> bo
     return True
 
 
+def discard_whole_disk(disk: str, size_bytes: int, cmd_runner: CommandRunner) -> bool:
+    """
+    Discard (TRIM) every block of the disk with a single BLKDISCARD ioctl.
+    
+    Args:
+        disk: Path to the disk device
+        size_bytes: Size of the disk in bytes
+        cmd_runner: CommandRunner instance for executing commands
+        
+    Returns:
+        True if the disk was discarded, False otherwise
+    """
+    if cmd_runner.simulating:
+        logger.info(f"Would discard all blocks on {disk}")
+        return True
+    
+    try:
+        fd = os.open(disk, os.O_WRONLY)
+        try:
+            fcntl.ioctl(fd, BLKDISCARD, struct.pack("QQ", 0, size_bytes))
+        finally:
+            os.close(fd)
+    except OSError as e:
+        logger.warning("%sCould not discard %s, continuing without it: %s%s", 
+                       cmd_runner.color_warning, disk, e, cmd_runner.color_reset)
+        return False
+    
+    logger.info(f"Discarded all blocks on {disk}")
+    return True
+
+
+def invalidate_disk_cache(disk: Optional[str] = None, cmd_runner: Optional[CommandRunner] = None) -> None:
+    """
+    Invalidate cached disk information.
+    
+    Args:
+        disk: Path to the disk device, or None to invalidate all disks
+        cmd_runner: CommandRunner whose block device listing should also be invalidated
+    """
+    if cmd_runner is not None:
+        # The bulk listing covers every disk, so any change makes it stale
+        cmd_runner.block_devices = None
+    
+    if disk is None:
+        _DISK_INFO_CACHE.clear()
+        return
+    
+    # Snapshot the keys, other disks may be partitioned concurrently
+    for key in [key for key in list(_DISK_INFO_CACHE) if key[0] == disk]:
+        _DISK_INFO_CACHE.pop(key, None)
+
+
 def get_disk_info(disk: str, cmd_runner: CommandRunner) -> DiskInfo:
+    """
+    Get information about the disk, reusing cached results from previous queries.
+    
+    Args:
+        disk: Path to the disk device
+        cmd_runner: CommandRunner instance for executing commands
+        
+    Returns:
+        DiskInfo object containing disk information (a copy the caller may modify)
+        
+    Raises:
+        DiskNotFoundError: If disk is not found
+    """
+    # Simulated disks are described by the simulation parameters
+    sim_params = tuple(sorted(cmd_runner.simulation_params.items())) if cmd_runner.simulating else ()
+    cache_key = (disk, cmd_runner.simulation_mode, cmd_runner.use_real_disk_info, sim_params)
+    
+    disk_info = _DISK_INFO_CACHE.get(cache_key)
+    if disk_info is None:
+        disk_info = _get_disk_info_uncached(disk, cmd_runner)
+        _DISK_INFO_CACHE[cache_key] = disk_info
+    
+    # Callers update their disk info (forced TRIM, discarded flag), keep the cached one intact
+    return disk_info.copy()
+
+
+def _get_disk_info_uncached(disk: str, cmd_runner: CommandRunner) -> DiskInfo:
     """
     Get information about the disk with simplified logic and better type safety.
     
@@ -133,42 +225,97 @@ def get_disk_info(disk: str, cmd_runner: CommandRunner) -> DiskInfo:
         DiskNotFoundError: If disk is not found
     """
     # Check if disk exists (except in simulation mode)
-    if not is_disk_available(disk, cmd_runner) and cmd_runner.simulation_mode != SimulationMode.SIMULATE:
+    if not is_disk_available(disk, cmd_runner) and not cmd_runner.simulating:
         raise DiskNotFoundError(f"Disk {disk} not found or is not a block device")
     
     # Initialize defaults
     disk_name = os.path.basename(disk)
-    is_nvme = "nvme" in disk_name.lower()
+    is_nvme = disk_name.startswith("nvme")
     
     # Initialize disk_info with default values
-    disk_info = DiskInfo(
-        size_bytes=0,
-        size_gib=0.0,
-        rotational=True,
-        nvme=is_nvme,
-        model="Unknown",
-        trim_supported=False,
-        cpu_count=os.cpu_count() or 4
-    )
+    disk_info: DiskInfo = {
+        "size_bytes": 0,
+        "size_gib": 0.0,
+        "rotational": True,
+        "nvme": is_nvme,
+        "model": "Unknown",
+        "trim_supported": False,
+        "discarded": False,
+        "cpu_count": _CPU_COUNT
+    }
     
     # Determine which method to use based on mode
-    if cmd_runner.simulation_mode == SimulationMode.SIMULATE:
-        if cmd_runner.use_real_disk_info:
-            _get_real_disk_info(disk, disk_name, disk_info, cmd_runner)
-        else:
-            _get_simulated_disk_info(disk, disk_name, disk_info, cmd_runner)
+    simulated = cmd_runner.simulating and not cmd_runner.use_real_disk_info
+    if simulated:
+        _get_simulated_disk_info(disk, disk_name, disk_info, cmd_runner)
     else:
         _get_real_disk_info(disk, disk_name, disk_info, cmd_runner)
     
-    # Set TRIM support based on disk type
-    if not disk_info["rotational"]:
-        disk_info["trim_supported"] = check_trim_support(
-            disk, is_ssd=not disk_info["rotational"], cmd_runner=cmd_runner
-        )
-    
     return disk_info
 
 
+def _list_block_devices(cmd_runner: CommandRunner) -> Dict[str, Dict[str, Any]]:
+    """
+    List all disks with a single lsblk call, so that probing several disks
+    costs one process instead of one per disk.
+    Results are cached on the CommandRunner until invalidate_disk_cache is called.
+    
+    Args:
+        cmd_runner: CommandRunner instance for executing commands
+        
+    Returns:
+        Dict mapping kernel device names to their lsblk columns (empty if lsblk fails)
+    """
+    if cmd_runner.block_devices is not None:
+        return cmd_runner.block_devices
+    
+    cmd_func = (cmd_runner.run_real if cmd_runner.simulating
+                else cmd_runner.run)
+    
+    block_devices: Dict[str, Dict[str, Any]] = {}
+    try:
+        result = cmd_func(["lsblk", "-J", "-b", "-d", "-o", LSBLK_COLUMNS])
+        for device in json.loads(result.stdout).get("blockdevices", []):
+            block_devices[device["name"]] = device
+    except Exception as e:
+        logger.debug(f"Could not list block devices: {e}")
+    
+    cmd_runner.block_devices = block_devices
+    return block_devices
+
+
+def _probe_disk(disk: str, cmd_runner: CommandRunner) -> Dict[str, Any]:
+    """
+    Get all the properties needed for a disk, from the bulk lsblk listing when
+    the disk is part of it and with a single lsblk call for the disk otherwise.
+    
+    Args:
+        disk: Path to the disk device
+        cmd_runner: CommandRunner instance for executing commands
+        
+    Returns:
+        Dict of lsblk columns (name, type, size, rota, model, disc-gran, disc-max, tran)
+        
+    Raises:
+        subprocess.CalledProcessError: If lsblk fails
+        ValueError: If lsblk output cannot be parsed
+    """
+    # lsblk lists disks by kernel name, so resolve symlinks like /dev/disk/by-id/*
+    device = _list_block_devices(cmd_runner).get(os.path.basename(os.path.realpath(disk)))
+    if device is not None:
+        return device
+    
+    # Use appropriate command function based on mode
+    cmd_func = (cmd_runner.run_real if cmd_runner.simulating
+                else cmd_runner.run)
+    
+    result = cmd_func(["lsblk", "-J", "-b", "-d", "-o", LSBLK_COLUMNS, disk])
+    try:
+        return json.loads(result.stdout)["blockdevices"][0]
+    except (KeyError, IndexError, TypeError) as e:
+        raise ValueError(f"Unexpected lsblk output for {disk}: {e}")
+
+
 def _get_real_disk_info(disk: str, disk_name: str, disk_info: DiskInfo, cmd_runner: CommandRunner) -> None:
     """
     Get real disk information from the system.
@@ -178,34 +325,50 @@ def _get_real_disk_info(disk: str, disk_name: str, disk_info: DiskInfo, cmd_runn
         disk_name: Base name of the disk
         disk_info: DiskInfo object to populate
         cmd_runner: CommandRunner instance for executing commands
+        
+    Raises:
+        DiskNotFoundError: If the device is not a whole disk
     """
-    # Use appropriate command function based on mode
-    cmd_func = (cmd_runner.run_real if cmd_runner.simulation_mode == SimulationMode.SIMULATE 
-                else cmd_runner.run)
-    
-    # Get disk size
     try:
-        result = cmd_func(["blockdev", "--getsize64", disk])
-        disk_info["size_bytes"] = int(result.stdout.strip())
-        disk_info["size_gib"] = disk_info["size_bytes"] / (1024**3)
-        logger.info(f"Disk size: {disk_info['size_gib']:.2f} GiB")
+        device = _probe_disk(disk, cmd_runner)
     except Exception as e:
-        logger.warning(colorize(f"Error getting disk size: {e}", 
-                               TermColors.WARNING, cmd_runner.colored_output))
+        logger.warning("%sError querying disk information: %s%s", 
+                       cmd_runner.color_warning, e, cmd_runner.color_reset)
         disk_info["size_bytes"] = 500107862016  # Default ~465.76 GiB
         disk_info["size_gib"] = disk_info["size_bytes"] / (1024**3)
+        
+        # Fall back to sysfs for the rotational flag and the discard limits
+        rotational = read_sysfs_value(f"/sys/block/{disk_name}/queue/rotational", "1")
+        disk_info["rotational"] = rotational == "1"
+        if not disk_info["rotational"]:
+            disk_info["trim_supported"] = check_trim_support(disk, cmd_runner, is_nvme=disk_info["nvme"])
+        return
+    
+    # Partitions, device-mapper and loop devices are block devices too, only accept whole disks
+    device_type = device.get("type")
+    if device_type != "disk":
+        raise DiskNotFoundError(f"{disk} is not a disk (type: {device_type})")
+    
+    # Get disk size
+    disk_info["size_bytes"] = int(device.get("size") or 0)
+    disk_info["size_gib"] = disk_info["size_bytes"] / (1024**3)
+    logger.info(f"Disk size: {disk_info['size_gib']:.2f} GiB")
     
     # Check if the disk is rotational (HDD) or non-rotational (SSD/NVMe)
-    rotational = read_sysfs_value(f"/sys/block/{disk_name}/queue/rotational", "1")
-    disk_info["rotational"] = rotational == "1"
+    # Older lsblk versions report booleans as "0"/"1" strings
+    disk_info["rotational"] = device.get("rota") in (True, "1", 1)
+    
+    # The transport is more reliable than the device name for NVMe detection
+    if device.get("tran") == "nvme":
+        disk_info["nvme"] = True
     
     # Get disk model
-    try:
-        result = cmd_func(["lsblk", "-n", "-o", "MODEL", disk], check=False)
-        disk_info["model"] = result.stdout.strip() or f"{'NVMe' if disk_info['nvme'] else 'SSD/HDD'}"
-    except Exception as e:
-        logger.warning(colorize(f"Error getting disk model: {e}", 
-                               TermColors.WARNING, cmd_runner.colored_output))
+    model = (device.get("model") or "").strip()
+    disk_info["model"] = model or f"{'NVMe' if disk_info['nvme'] else 'SSD/HDD'}"
+    
+    # A non-zero maximum discard size means the device accepts TRIM/discard
+    if not disk_info["rotational"]:
+        disk_info["trim_supported"] = int(device.get("disc-max") or 0) > 0
 
 
 def _get_simulated_disk_info(disk: str, disk_name: str, disk_info: DiskInfo, cmd_runner: CommandRunner) -> None:
@@ -238,9 +401,17 @@ def _get_simulated_disk_info(disk: str, disk_name: str, disk_info: DiskInfo, cmd
     disk_info["rotational"] = params.get("rotational", False)
     
     # NVMe flag - keep the value set during initialization if not in params
-    if "nvme" in params:
-        disk_info["nvme"] = params["nvme"]
+    nvme = params.get("nvme")
+    if nvme is not None:
+        disk_info["nvme"] = nvme
         
     # Model name
     disk_type = params.get("disk_type", "ssd" if not disk_info["rotational"] else "hdd")
-    disk_info["model"] = f"SIMULATED {disk_type.upper()}"
\ No newline at end of file
+    disk_info["model"] = f"SIMULATED {disk_type.upper()}"
+    
+    # TRIM support, assuming modern SSDs support it unless configured otherwise
+    if not disk_info["rotational"]:
+        trim_supported = params.get("trim_supported")
+        if trim_supported is not None:
+            logger.info(f"Simulation: disk configured with TRIM support: {trim_supported}")
+        disk_info["trim_supported"] = True if trim_supported is None else trim_supported
\ No newline at end of file
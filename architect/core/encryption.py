@@ -31,7 +31,7 @@ def reset_opal_drive(disk: str, psid: str, cmd_runner: CommandRunner) -> None:
     try:
         run_cryptsetup_cmd(
             ["cryptsetup", "erase", "--hw-opal-factory-reset", disk],
-            f"{psid}\nYES\n",  # Auto-confirm with YES
+            build_secret_input(psid, "YES"),  # Auto-confirm with YES
             cmd_runner
         )
         logger.info("Opal drive reset successful")
@@ -39,22 +39,44 @@ def reset_opal_drive(disk: str, psid: str, cmd_runner: CommandRunner) -> None:
         raise EncryptionError(f"Failed to reset Opal drive: {e}")
 
 
-def run_cryptsetup_cmd(cmd: List[str], secret_input: str, cmd_runner: CommandRunner) -> None:
+def build_secret_input(*lines: str) -> bytearray:
+    """
+    Build the stdin content for a cryptsetup command in a mutable buffer,
+    so that it can be wiped once the command has consumed it.
+    
+    Args:
+        *lines: Secrets (or confirmations) to send, one per line
+        
+    Returns:
+        Buffer holding the newline-terminated lines
+    """
+    buf = bytearray()
+    for line in lines:
+        buf += line.encode("utf-8")
+        buf += b"\n"
+    return buf
+
+
+def run_cryptsetup_cmd(cmd: List[str], secret_input: bytearray, cmd_runner: CommandRunner) -> None:
     """
     Run a cryptsetup command with the provided secret input.
+    The secret buffer is zeroized once the command has completed.
     
     Args:
         cmd: The cryptsetup command to run
-        secret_input: Secret input to provide to the command
+        secret_input: Secret input to provide to the command (see build_secret_input())
         cmd_runner: CommandRunner instance for executing commands
         
     Raises:
         EncryptionError: If the command fails
     """
     try:
-        cmd_runner.run(cmd, input=secret_input)
+        cmd_runner.run(cmd, input=secret_input, text=False)
     except subprocess.CalledProcessError as e:
-        raise EncryptionError(f"Cryptsetup command failed: {e.stderr if hasattr(e, 'stderr') else str(e)}")
+        stderr = e.stderr.decode(errors="replace") if isinstance(e.stderr, bytes) else e.stderr
+        raise EncryptionError(f"Cryptsetup command failed: {stderr or e}")
+    finally:
+        secret_input[:] = bytes(len(secret_input))
 
 
 def setup_encryption(disk: str, partitions: Dict[str, str], args: Any, cmd_runner: CommandRunner) -> Dict[str, str]:
@@ -93,7 +115,7 @@ def setup_encryption(disk: str, partitions: Dict[str, str], args: Any, cmd_runne
             
             run_cryptsetup_cmd(
                 ["cryptsetup", "luksFormat", "--type", "luks2", "--hw-opal-only", system_partition],
-                f"{luks_secret}\n{luks_secret}\n{admin_secret}\n{admin_secret}\n",
+                build_secret_input(luks_secret, luks_secret, admin_secret, admin_secret),
                 cmd_runner
             )
             
@@ -109,7 +131,7 @@ def setup_encryption(disk: str, partitions: Dict[str, str], args: Any, cmd_runne
                     "--hash", "sha512", "--pbkdf", "argon2id", "--iter-time", "5000",
                     system_partition
                 ],
-                f"{luks_secret}\n{luks_secret}\n{admin_secret}\n{admin_secret}\n",
+                build_secret_input(luks_secret, luks_secret, admin_secret, admin_secret),
                 cmd_runner
             )
             
@@ -125,7 +147,7 @@ def setup_encryption(disk: str, partitions: Dict[str, str], args: Any, cmd_runne
                     "--hash", "sha512", "--pbkdf", "argon2id", "--iter-time", "5000",
                     system_partition
                 ],
-                f"{luks_secret}\n{luks_secret}\n",  # Double input for confirmation
+                build_secret_input(luks_secret, luks_secret),  # Double input for confirmation
                 cmd_runner
             )
         
@@ -134,14 +156,14 @@ def setup_encryption(disk: str, partitions: Dict[str, str], args: Any, cmd_runne
             psid, admin_secret, luks_secret = args.hardware_encryption
             run_cryptsetup_cmd(
                 ["cryptsetup", "open", system_partition, luks_name],
-                f"{luks_secret}\n",
+                build_secret_input(luks_secret),
                 cmd_runner
             )
         elif sw_only:
             luks_secret = args.software_encryption
             run_cryptsetup_cmd(
                 ["cryptsetup", "open", system_partition, luks_name],
-                f"{luks_secret}\n",
+                build_secret_input(luks_secret),
                 cmd_runner
             )
         
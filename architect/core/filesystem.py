@@ -3,25 +3,58 @@ Filesystem creation and management module with parallel processing support.
 
 This module handles filesystem creation and btrfs subvolume setup.
 """
+import contextlib
+import fcntl
 import os
 import logging
+import re
+import struct
 import subprocess
 import tempfile
-from typing import Dict, Any, List, Tuple, Callable, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Tuple, Callable, Iterator, Optional
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from architect.utils.command import CommandRunner, SimulationMode
+from architect.utils.command import CommandRunner
 from architect.core.exceptions import FilesystemError
 
 logger = logging.getLogger('architect')
 
+# Matches the "Subvolume ID:" line of `btrfs subvolume show`
+_SUBVOL_ID_RE = re.compile(r"^\s*Subvolume ID:\s*(\d+)", re.MULTILINE)
+
+# btrfs ioctl interface (see linux/btrfs.h)
+BTRFS_FIRST_FREE_OBJECTID = 256       # Inode number of a subvolume root directory
+BTRFS_IOC_INO_LOOKUP = 0xD0009412     # _IOWR(0x94, 18, struct btrfs_ioctl_ino_lookup_args)
+BTRFS_IOC_DEFAULT_SUBVOL = 0x40089413 # _IOW(0x94, 19, __u64)
+
+
+def _drop_page_cache(device: str) -> None:
+    """
+    Ask the kernel to drop the cached pages of a device written by mkfs.
+    
+    The metadata written by mkfs is never read back through the block device,
+    so keeping it cached only evicts pages that are still useful.
+    
+    Args:
+        device: Device path to drop the cached pages of
+    """
+    try:
+        fd = os.open(device, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        logger.debug(f"Could not drop page cache for {device}: {e}")
+
 
 def _create_filesystem(
     filesystem_type: str, 
     device: str, 
     label: str, 
-    cmd_runner: CommandRunner
+    cmd_runner: CommandRunner,
+    discarded: bool = False
 ) -> Tuple[str, str, bool]:
     """
     Create a single filesystem on a partition.
@@ -31,6 +64,7 @@ def _create_filesystem(
         device: Device path to create filesystem on
         label: Label for the filesystem
         cmd_runner: CommandRunner instance for executing commands
+        discarded: Whether the whole disk was already discarded, so mkfs can skip it
         
     Returns:
         Tuple of (device, filesystem_type, success)
@@ -40,14 +74,24 @@ def _create_filesystem(
             cmd_runner.run(["mkfs.fat", "-F32", "-n", label, device])
             logger.info(f"Created FAT32 filesystem on {device}")
         elif filesystem_type == "ext4":
-            cmd_runner.run(["mkfs.ext4", "-L", label, device])
+            # Let the kernel initialize the inode tables and journal in the background
+            extended_options = "lazy_itable_init=1,lazy_journal_init=1"
+            if discarded:
+                extended_options += ",nodiscard"
+            cmd_runner.run(["mkfs.ext4", "-F", "-E", extended_options, "-L", label, device])
             logger.info(f"Created ext4 filesystem on {device}")
         elif filesystem_type == "btrfs":
-            cmd_runner.run(["mkfs.btrfs", "-L", label, device])
+            cmd = ["mkfs.btrfs", "-f", "-L", label]
+            if discarded:
+                cmd.append("--nodiscard")
+            cmd_runner.run(cmd + [device])
             logger.info(f"Created btrfs filesystem on {device}")
         else:
             logger.error(f"Unsupported filesystem type: {filesystem_type}")
             return (device, filesystem_type, False)
+        
+        if not cmd_runner.simulating:
+            _drop_page_cache(device)
             
         return (device, filesystem_type, True)
     except subprocess.CalledProcessError as e:
@@ -55,11 +99,20 @@ def _create_filesystem(
         return (device, filesystem_type, False)
 
 
+# Filesystem type and label for each partition role
+FILESYSTEM_LAYOUT = {
+    "efi": ("fat", "ESP"),         # FAT32 for EFI
+    "boot": ("ext4", "boot"),      # ext4 for boot
+    "system": ("btrfs", "root"),   # btrfs for system
+}
+
+
 def create_filesystems(
     partitions: Dict[str, str], 
     disk_info: Dict[str, Any], 
     args: Any, 
-    cmd_runner: CommandRunner
+    cmd_runner: CommandRunner,
+    roles: Optional[Tuple[str, ...]] = None
 ) -> None:
     """
     Create filesystems on partitions in parallel.
@@ -69,6 +122,7 @@ def create_filesystems(
         disk_info: Dict containing disk info
         args: Command line arguments
         cmd_runner: CommandRunner instance for executing commands
+        roles: Partition roles to format (all of FILESYSTEM_LAYOUT if None)
         
     Raises:
         FilesystemError: If there's an error in filesystem creation
@@ -76,36 +130,29 @@ def create_filesystems(
     logger.info("Creating filesystems in parallel")
     
     # Define filesystem creation tasks
+    discarded = disk_info.get("discarded", False)
     fs_tasks = [
-        ("fat", partitions["efi"], "ESP"),           # FAT32 for EFI
-        ("ext4", partitions["boot"], "boot"),        # ext4 for boot
-        ("btrfs", partitions["system"], "root"),   # btrfs for system
+        (fs_type, partitions[role], label)
+        for role, (fs_type, label) in FILESYSTEM_LAYOUT.items()
+        if roles is None or role in roles
     ]
     
-    # Set maximum number of workers based on CPU count with reasonable limits
-    max_workers = min(len(fs_tasks), disk_info.get("cpu_count", os.cpu_count() or 2))
-    
-    # In simulation mode, reduce to 1 worker to simplify output
-    if cmd_runner.simulation_mode == SimulationMode.SIMULATE:
-        max_workers = 1
-    
-    failed_tasks = []
-    
-    # Execute filesystem creation in parallel
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all tasks
-        future_to_fs = {
-            executor.submit(_create_filesystem, fs_type, device, label, cmd_runner): 
-            (fs_type, device)
-            for fs_type, device, label in fs_tasks
-        }
+    if cmd_runner.simulating:
+        # In simulation mode, run sequentially in this thread to keep the output ordered
+        results = [_create_filesystem(fs_type, device, label, cmd_runner, discarded)
+                   for fs_type, device, label in fs_tasks]
+    else:
+        # Set maximum number of workers based on CPU count with reasonable limits
+        max_workers = min(len(fs_tasks), disk_info.get("cpu_count", os.cpu_count() or 2))
         
-        # Process results as they complete
-        for future in as_completed(future_to_fs):
-            device, fs_type, success = future.result()
-            if not success:
-                fs_info = future_to_fs[future]
-                failed_tasks.append(fs_info)
+        # Execute filesystem creation in parallel, the workers spend their time
+        # waiting on the mkfs processes with the GIL released
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                lambda task: _create_filesystem(*task, cmd_runner, discarded), fs_tasks
+            ))
+    
+    failed_tasks = [(fs_type, device) for device, fs_type, success in results if not success]
     
     # If any tasks failed, raise an error
     if failed_tasks:
@@ -114,7 +161,115 @@ def create_filesystems(
             f"Failed to create filesystem(s): {failed_info}"
         )
     
-    logger.info("All filesystems created successfully")
+    if roles is None:
+        logger.info("All filesystems created successfully")
+    else:
+        logger.info(f"Filesystems created successfully for: {', '.join(roles)}")
+
+
+def _set_default_subvolume_ioctl(mount_point: str, subvol_path: str) -> int:
+    """
+    Set a subvolume as the default one using btrfs ioctls directly.
+    
+    Args:
+        mount_point: Mount point of the btrfs filesystem
+        subvol_path: Path of the subvolume to set as default
+        
+    Returns:
+        ID of the subvolume set as default
+        
+    Raises:
+        OSError: If an ioctl fails
+    """
+    # Look up the tree ID (subvolume ID) owning the subvolume root directory
+    fd = os.open(subvol_path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        lookup_args = bytearray(struct.pack("QQ", 0, BTRFS_FIRST_FREE_OBJECTID)) + bytearray(4080)
+        fcntl.ioctl(fd, BTRFS_IOC_INO_LOOKUP, lookup_args)
+        subvol_id = struct.unpack_from("Q", lookup_args)[0]
+    finally:
+        os.close(fd)
+    
+    fd = os.open(mount_point, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        fcntl.ioctl(fd, BTRFS_IOC_DEFAULT_SUBVOL, struct.pack("Q", subvol_id))
+    finally:
+        os.close(fd)
+    
+    return subvol_id
+
+
+def _set_default_subvolume(mount_point: str, subvol_path: str, cmd_runner: CommandRunner) -> None:
+    """
+    Set a subvolume as the default one, through ioctls when possible and
+    falling back to the btrfs command line tool.
+    
+    Args:
+        mount_point: Mount point of the btrfs filesystem
+        subvol_path: Path of the subvolume to set as default
+        cmd_runner: CommandRunner instance for executing commands
+        
+    Raises:
+        FilesystemError: If the default subvolume cannot be set
+    """
+    subvol_name = os.path.basename(subvol_path)
+    
+    if not cmd_runner.simulating:
+        try:
+            subvol_id = _set_default_subvolume_ioctl(mount_point, subvol_path)
+            logger.info(f"Set {subvol_name} (ID: {subvol_id}) as the default subvolume")
+            return
+        except OSError as e:
+            logger.debug(f"btrfs ioctls failed, falling back to the btrfs tool: {e}")
+    
+    try:
+        # Obtenir l'ID du subvolume directement avec la commande show
+        result = cmd_runner.run(["btrfs", "subvolume", "show", subvol_path])
+        
+        # Extraire l'ID du subvolume des informations
+        match = _SUBVOL_ID_RE.search(result.stdout)
+        if not match:
+            raise FilesystemError("Could not extract subvolume ID from btrfs output")
+        
+        subvol_id = match.group(1)
+        cmd_runner.run(["btrfs", "subvolume", "set-default", subvol_id, mount_point])
+        logger.info(f"Set {subvol_name} (ID: {subvol_id}) as the default subvolume")
+    except subprocess.CalledProcessError as e:
+        raise FilesystemError(f"Failed to set {subvol_name} as the default subvolume: {e}")
+
+
+@contextlib.contextmanager
+def _temporary_mount(device: str, cmd_runner: CommandRunner) -> Iterator[str]:
+    """
+    Mount a device on a temporary directory for the duration of the context.
+    The device is always unmounted and the directory removed on exit.
+    
+    Args:
+        device: Device path to mount
+        cmd_runner: CommandRunner instance for executing commands
+        
+    Yields:
+        Path of the temporary mount point
+    """
+    # Create a temporary mount point
+    if cmd_runner.simulating:
+        temp_dir = "/tmp/architect-sim-mount"  # Simulated path
+    else:
+        temp_dir = tempfile.mkdtemp(prefix="architect-mnt-")
+    
+    try:
+        cmd_runner.run(["mount", device, temp_dir])
+        yield temp_dir
+    finally:
+        cmd_runner.run(["umount", temp_dir], check=False)
+        
+        # rmdir (rather than a recursive removal) refuses to touch the
+        # directory if it is somehow still mounted
+        if not cmd_runner.simulating:
+            try:
+                os.rmdir(temp_dir)
+            except OSError as e:
+                logger.warning(f"Could not remove temporary mount point {temp_dir}: {e}")
 
 
 def create_btrfs_subvolumes(partitions: Dict[str, str], args: Any, cmd_runner: CommandRunner) -> Dict[str, str]:
@@ -136,78 +291,39 @@ def create_btrfs_subvolumes(partitions: Dict[str, str], args: Any, cmd_runner: C
     
     system_partition = partitions["system"]
     
-    # Create a temporary mount point
-    if cmd_runner.simulation_mode == SimulationMode.SIMULATE:
-        temp_dir = "/tmp/architect-sim-mount"  # Simulated path
-    else:
-        temp_dir = tempfile.mkdtemp()
-    
     try:
-        # Mount the btrfs partition
-        cmd_runner.run(["mount", system_partition, temp_dir])
-        
-        # Define subvolumes to create
-        subvolumes = [
-            "@",           # Root
-            "@boot",       # Boot files
-            "@home",       # User home directories
-            "@opt",        # Optional software
-            "@root",       # Root user home
-            "@srv",        # Service data
-            "@tmp",        # Temporary files
-            "@usr",        # System binaries and libraries
-            "@var",        # Variable data
-            "@var_log",    # System logs
-            "@var_tmp"     # Persistent temporary files
-        ]
-        
-        subvolume_paths = {}
-        
-        # Create each subvolume
-        for subvol in subvolumes:
-            subvol_path = os.path.join(temp_dir, subvol)
+        with _temporary_mount(system_partition, cmd_runner) as temp_dir:
+            # Define subvolumes to create
+            subvolumes = [
+                "@",           # Root
+                "@boot",       # Boot files
+                "@home",       # User home directories
+                "@opt",        # Optional software
+                "@root",       # Root user home
+                "@srv",        # Service data
+                "@tmp",        # Temporary files
+                "@usr",        # System binaries and libraries
+                "@var",        # Variable data
+                "@var_log",    # System logs
+                "@var_tmp"     # Persistent temporary files
+            ]
+            
+            subvolume_paths = {subvol: os.path.join(temp_dir, subvol) for subvol in subvolumes}
+            
+            # btrfs creates every destination given to a single subvolume create,
+            # in order, so one process is enough for all subvolumes
             try:
-                cmd_runner.run(["btrfs", "subvolume", "create", subvol_path])
-                subvolume_paths[subvol] = subvol_path
-                logger.info(f"Created subvolume {subvol}")
+                cmd_runner.run(["btrfs", "subvolume", "create", *subvolume_paths.values()])
             except subprocess.CalledProcessError as e:
-                raise FilesystemError(f"Failed to create subvolume {subvol}: {e}")
-        
-        # Set @ as the default subvolume for a DPS friendly behavior
-        try:
-            # Obtenir l'ID du subvolume @ directement avec la commande show
-            root_subvol_path = os.path.join(temp_dir, "@")
-            result = cmd_runner.run(["btrfs", "subvolume", "show", root_subvol_path])
+                failed = next((subvol for subvol, subvol_path in subvolume_paths.items()
+                               if not os.path.isdir(subvol_path)), None)
+                raise FilesystemError(f"Failed to create subvolume {failed or ', '.join(subvolumes)}: {e.stderr or e}")
+            logger.info(f"Created subvolumes {', '.join(subvolumes)}")
             
-            # Extraire l'ID du subvolume des informations
-            root_subvol_id = None
-            for line in result.stdout.strip().split('\n'):
-                if line.strip().startswith('Subvolume ID:'):
-                    root_subvol_id = line.split(':')[1].strip()
-                    break
-            
-            if root_subvol_id:
-                cmd_runner.run(["btrfs", "subvolume", "set-default", root_subvol_id, temp_dir])
-                logger.info(f"Set @ (ID: {root_subvol_id}) as the default subvolume")
-            else:
-                raise FilesystemError("Could not extract subvolume ID from btrfs output")
-        except subprocess.CalledProcessError as e:
-            raise FilesystemError(f"Failed to set @ as the default subvolume: {e}")
-        
-        # Clean up
-        cmd_runner.run(["umount", temp_dir])
-        
-        if cmd_runner.simulation_mode != SimulationMode.SIMULATE:
-            os.rmdir(temp_dir)
+            # Set @ as the default subvolume for a DPS friendly behavior
+            _set_default_subvolume(temp_dir, subvolume_paths["@"], cmd_runner)
         
         return subvolume_paths
     
     except Exception as e:
-        # Clean up in case of error
-        try:
-            cmd_runner.run(["umount", temp_dir], check=False)
-            if cmd_runner.simulation_mode != SimulationMode.SIMULATE:
-                os.rmdir(temp_dir)
-        except Exception:
-            pass
         raise FilesystemError(f"Error creating btrfs subvolumes: {e}")
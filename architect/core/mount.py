@@ -7,16 +7,61 @@ Refactored for better code organization and readability.
 import os
 import logging
 import subprocess
-from typing import Dict, Any, List
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 from pathlib import Path
 
-from architect.utils.command import CommandRunner, SimulationMode
-from architect.utils.format import TermColors, colorize
+from architect.utils import mount_syscall
+from architect.utils.command import CommandRunner
+from architect.utils.format import TermColors
 from architect.utils.types import DiskInfo, MountOptions, PartitionTable
 from architect.core.exceptions import MountError
 
 logger = logging.getLogger('architect')
 
+# Base mount options with security defaults following ANSSI recommendations
+# We apply reasonable security options by default, even without hardened mode
+_BASE_MOUNT_OPTIONS: Mapping[str, str] = MappingProxyType({
+    "/": "defaults,noatime",
+    "/boot": "defaults,nodev,nosuid",
+    "/boot/efi": "umask=0077,nodev,nosuid,noexec",
+    "/home": "defaults,nodev,nosuid",
+    "/opt": "defaults,nodev,nosuid",
+    "/root": "defaults,nodev,nosuid",
+    "/srv": "defaults,nodev,nosuid",
+    "/tmp": "defaults,nodev,nosuid,noexec",
+    "/usr": "defaults,nodev",
+    "/var": "defaults,nosuid,nodev",
+    "/var/log": "defaults,nodev,nosuid,noexec",
+    "/var/tmp": "defaults,nodev,nosuid,noexec"
+})
+
+# In hardened mode, we further restrict some partitions
+_HARDENED_MOUNT_OPTIONS: Mapping[str, str] = MappingProxyType({
+    "/boot": "defaults,nodev,nosuid,noauto",
+    "/var": "defaults,nosuid,nodev,noexec", # Note: This may cause issues with package managers
+    # Add hidepid=2 to /proc in fstab separately
+})
+
+# Subvolumes mounted below the root subvolume, in mount order: the main
+# subvolumes, then the ones nested under /var
+SUBVOLUME_MOUNTPOINTS: Tuple[Tuple[str, str], ...] = (
+    ("@home", "/home"),
+    ("@opt", "/opt"),
+    ("@root", "/root"),
+    ("@srv", "/srv"),
+    ("@tmp", "/tmp"),
+    ("@usr", "/usr"),
+    ("@var", "/var"),
+    ("@var_log", "/var/log"),
+    ("@var_tmp", "/var/tmp"),
+)
+
+# Maximum number of filesystems mounted at the same time
+MAX_PARALLEL_MOUNTS = 4
+
 
 def determine_mount_options(disk_info: DiskInfo, args: Any) -> MountOptions:
     """
@@ -29,40 +74,61 @@ def determine_mount_options(disk_info: DiskInfo, args: Any) -> MountOptions:
     Returns:
         Dict mapping mount points to their mount options
     """
-    # Base mount options with security defaults following ANSSI recommendations
-    # We apply reasonable security options by default, even without hardened mode
-    mount_options: MountOptions = {
-        "/": "defaults,noatime",
-        "/boot": "defaults,nodev,nosuid",
-        "/boot/efi": "umask=0077,nodev,nosuid,noexec",
-        "/home": "defaults,nodev,nosuid",
-        "/opt": "defaults,nodev,nosuid",
-        "/root": "defaults,nodev,nosuid",
-        "/srv": "defaults,nodev,nosuid",
-        "/tmp": "defaults,nodev,nosuid,noexec",
-        "/usr": "defaults,nodev",
-        "/var": "defaults,nosuid,nodev",
-        "/var/log": "defaults,nodev,nosuid,noexec",
-        "/var/tmp": "defaults,nodev,nosuid,noexec"
-    }
+    rotational = disk_info["rotational"]
+    trim_supported = disk_info.get("trim_supported", False)
+    
+    # Color sequences for the log calls below, formatted only if the records are emitted
+    colored = not args.no_color
+    info = TermColors.INFO if colored else ""
+    warning = TermColors.WARNING if colored else ""
+    reset = TermColors.ENDC if colored else ""
     
     # Apply even more restrictive hardened mount options if requested
     if args.hardened:
-        logger.info(colorize("Applying hardened mount options according to ANSSI recommendations", 
-                            TermColors.INFO, args.no_color))
-        mount_options.update({
-            # In hardened mode, we further restrict some partitions
-            "/boot": "defaults,nodev,nosuid,noauto",
-            "/var": "defaults,nosuid,nodev,noexec", # Note: This may cause issues with package managers
-            # Add hidepid=2 to /proc in fstab separately
-        })
-        logger.warning(colorize("Note: Hardened mode with noexec on /var may require special handling for package management", 
-                               TermColors.WARNING, not args.no_color))
+        logger.info("%sApplying hardened mount options according to ANSSI recommendations%s", info, reset)
+        logger.warning("%sNote: Hardened mode with noexec on /var may require special handling for package management%s", 
+                       warning, reset)
+    
+    if not rotational and trim_supported:
+        logger.info("%sAdding discard mount option for SSD partitions (TRIM supported)%s", info, reset)
+    
+    return dict(_compute_mount_options(
+        rotational,
+        trim_supported,
+        disk_info["nvme"] and disk_info["cpu_count"] <= 4,
+        bool(args.hardened),
+        args.btrfs_options or None
+    ))
+
+
+@functools.lru_cache(maxsize=16)
+def _compute_mount_options(
+    rotational: bool, 
+    trim_supported: bool, 
+    nvme_low_core: bool, 
+    hardened: bool, 
+    btrfs_options: Optional[str]
+) -> Tuple[Tuple[str, str], ...]:
+    """
+    Compute the mount options for a disk configuration.
+    
+    Args:
+        rotational: Whether the disk is rotational
+        trim_supported: Whether the disk supports TRIM
+        nvme_low_core: Whether the disk is an NVMe drive on a system with 4 cores or less
+        hardened: Whether to apply hardened mount options
+        btrfs_options: Filesystem-wide btrfs options given by the user, if any
+        
+    Returns:
+        Tuple of (mount point, mount options) pairs
+    """
+    mount_options: MountOptions = dict(_BASE_MOUNT_OPTIONS)
+    
+    if hardened:
+        mount_options.update(_HARDENED_MOUNT_OPTIONS)
     
     # Add discard option for SSD partitions if TRIM is supported
-    if not disk_info["rotational"] and disk_info.get("trim_supported", False):
-        logger.info(colorize("Adding discard mount option for SSD partitions (TRIM supported)", 
-                            TermColors.INFO, not args.no_color))
+    if not rotational and trim_supported:
         for mountpoint in ["/boot", "/boot/efi"]:
             mount_options[mountpoint] += ",discard"
     
@@ -70,72 +136,153 @@ def determine_mount_options(disk_info: DiskInfo, args: Any) -> MountOptions:
     fs_options = ""
     
     # Use provided options if specified
-    if args.btrfs_options:
-        fs_options = args.btrfs_options
+    if btrfs_options:
+        fs_options = btrfs_options
     else:
         # Apply default options based on disk type
-        if disk_info["rotational"]:
+        if rotational:
             # HDD defaults
             fs_options = "autodefrag,compress-force=zstd:2"
-        elif disk_info["nvme"] and disk_info["cpu_count"] <= 4:
+        elif nvme_low_core:
             # NVMe with low core count - no compression to maximize performance
             fs_options = ""
             # Add discard if TRIM is supported
-            if disk_info.get("trim_supported", False):
+            if trim_supported:
                 fs_options = "discard=async"
         else:
             # SSD defaults
             fs_options = "ssd,compress-force=zstd:1"
             # Add discard if TRIM is supported
-            if disk_info.get("trim_supported", False):
+            if trim_supported:
                 fs_options += ",discard=async"
     
     # Update root mount options with filesystem-wide options
     if fs_options:
         mount_options["/"] = f"{mount_options['/']},{fs_options}"
     
-    return mount_options
+    return tuple(mount_options.items())
 
 
-def _create_directory(path: Path, cmd_runner: CommandRunner) -> None:
+def _create_directory(path: Path, cmd_runner: CommandRunner, parents: bool = False) -> None:
     """
     Create directory if it doesn't exist or log that it would be created in simulation mode.
     
+    Mount points are created right after their parent filesystem is mounted, so
+    a single mkdir() is enough and missing parents are only created on request.
+    
     Args:
         path: Directory path to create
         cmd_runner: CommandRunner instance for executing commands
+        parents: Whether to create missing parent directories too
     """
-    if cmd_runner.simulation_mode == SimulationMode.SIMULATE:
+    if cmd_runner.simulating:
         logger.info(f"Would create directory: {path}")
+    elif parents:
+        os.makedirs(path, exist_ok=True)
     else:
-        path.mkdir(exist_ok=True, parents=True)
+        try:
+            os.mkdir(path)
+        except FileExistsError:
+            pass
 
 
-def _mount_filesystem(device: str, mount_point: Path, options: str, cmd_runner: CommandRunner) -> None:
+def build_subvol_options(subvol: str, options: str) -> str:
+    """
+    Build the mount options for a btrfs subvolume.
+    
+    Args:
+        subvol: Subvolume name
+        options: Mount options of the mount point
+        
+    Returns:
+        Mount options selecting the subvolume
+    """
+    if options == "defaults":
+        return f"subvol={subvol}"
+    return f"subvol={subvol},{options}"
+
+
+def _mount_filesystem(device: str, mount_point: Path, fstype: str, options: str, cmd_runner: CommandRunner) -> None:
     """
     Mount a filesystem or log that it would be mounted in simulation mode.
     
+    Real mounts call mount(2) directly, saving a mount process per filesystem;
+    simulated mounts still go through the command runner for the report.
+    
     Args:
         device: Device path to mount
         mount_point: Path where to mount
+        fstype: Filesystem type
         options: Mount options
         cmd_runner: CommandRunner instance for executing commands
         
     Raises:
-        MountError: If mount command fails
+        MountError: If the mount fails
     """
     try:
-        cmd_runner.run(["mount", "-o", options, device, str(mount_point)])
-        logger.info(colorize(f"Mounted {device} to {mount_point} with options: {options}", 
-                            TermColors.SUCCESS, cmd_runner.colored_output))
-    except subprocess.CalledProcessError as e:
+        if cmd_runner.simulating:
+            cmd_runner.run(["mount", "-o", options, device, str(mount_point)])
+        else:
+            logger.debug(f"mount(2): {device} on {mount_point} type {fstype} ({options})")
+            mount_syscall.mount(device, str(mount_point), fstype, options)
+        logger.info("%sMounted %s to %s with options: %s%s", 
+                    cmd_runner.color_success, device, mount_point, options, cmd_runner.color_reset)
+    except (subprocess.CalledProcessError, OSError) as e:
         raise MountError(f"Failed to mount {device} to {mount_point}: {e}")
 
 
+def _build_mount_plan(partitions: PartitionTable, mount_options: MountOptions, target_path: Path) -> List[Tuple[str, Path, str, str]]:
+    """
+    Build the list of filesystems to mount, in mount order.
+    
+    Args:
+        partitions: Dict mapping partition roles to device paths
+        mount_options: Dict mapping mount points to their mount options
+        target_path: Target directory
+        
+    Returns:
+        List of (device, mount point, filesystem type, options), each mount point
+        living on a filesystem mounted before it
+    """
+    system = partitions["system"]
+    
+    mounts: List[Tuple[str, Path, str, str]] = [
+        (system, target_path, "btrfs", build_subvol_options("@", mount_options["/"])),
+        (partitions["boot"], target_path / "boot", "ext4", mount_options["/boot"]),
+        (partitions["efi"], target_path / "boot" / "efi", "vfat", mount_options["/boot/efi"]),
+    ]
+    
+    mounts.extend(
+        (system, target_path / mountpoint.lstrip("/"), "btrfs",
+         build_subvol_options(subvol, mount_options[mountpoint]))
+        for subvol, mountpoint in SUBVOLUME_MOUNTPOINTS
+    )
+    
+    return mounts
+
+
+def _mount_waves(mounts: List[Tuple[str, Path, str, str]], target_path: Path) -> List[List[Tuple[str, Path, str, str]]]:
+    """
+    Group mounts by the depth of their mount point below the target directory.
+    
+    Args:
+        mounts: List of (device, mount point, filesystem type, options) in mount order
+        target_path: Target directory
+        
+    Returns:
+        Lists of mounts that can be done in parallel, in the order they must be done
+    """
+    waves: Dict[int, List[Tuple[str, Path, str, str]]] = {}
+    for entry in mounts:
+        depth = len(entry[1].relative_to(target_path).parts)
+        waves.setdefault(depth, []).append(entry)
+    
+    return [waves[depth] for depth in sorted(waves)]
+
+
 def mount_filesystems(partitions: PartitionTable, mount_options: MountOptions, args: Any, cmd_runner: CommandRunner) -> None:
     """
     Mount filesystems to target directory.
-    Refactored to use helper functions for better code organization.
     
     Args:
         partitions: Dict mapping partition roles to device paths
@@ -150,120 +297,26 @@ def mount_filesystems(partitions: PartitionTable, mount_options: MountOptions, a
     target_path = Path(target)
     
     # Create target directory if it doesn't exist
-    _create_directory(target_path, cmd_runner)
+    _create_directory(target_path, cmd_runner, parents=True)
     
-    # Define steps for mounting in correct order
-    mount_steps = [
-        # Step 1: Mount root subvolume
-        {
-            "action": "mount_root",
-            "device": partitions["system"],
-            "path": target_path,
-            "options": mount_options["/"],
-            "subvol": "@"
-        },
-        
-        # Step 2: Create first-level directories
-        {
-            "action": "create_dirs",
-            "directories": ["boot", "home", "opt", "root", "srv", "tmp", "usr", "var"],
-            "parent": target_path
-        },
-        
-        # Step 3: Mount boot partition
-        {
-            "action": "mount",
-            "device": partitions["boot"],
-            "path": target_path / "boot",
-            "options": mount_options["/boot"]
-        },
-        
-        # Step 4: Create and mount boot/efi
-        {
-            "action": "create_and_mount",
-            "device": partitions["efi"],
-            "dir_path": target_path / "boot" / "efi",
-            "options": mount_options["/boot/efi"]
-        },
-        
-        # Step 5: Mount main subvolumes
-        {
-            "action": "mount_subvolumes",
-            "device": partitions["system"],
-            "subvolumes": {
-                "@home": "/home",
-                "@opt": "/opt",
-                "@root": "/root",
-                "@srv": "/srv",
-                "@tmp": "/tmp",
-                "@usr": "/usr",
-                "@var": "/var"
-            },
-            "base_path": target_path,
-            "mount_options": mount_options
-        },
-        
-        # Step 6: Create and mount second-level directories under /var
-        {
-            "action": "create_dirs",
-            "directories": ["log", "tmp"],
-            "parent": target_path / "var"
-        },
-        
-        # Step 7: Mount var subdirectory subvolumes
-        {
-            "action": "mount_subvolumes",
-            "device": partitions["system"],
-            "subvolumes": {
-                "@var_log": "/var/log",
-                "@var_tmp": "/var/tmp"
-            },
-            "base_path": target_path,
-            "mount_options": mount_options
-        }
-    ]
+    mounts = _build_mount_plan(partitions, mount_options, target_path)
     
-    # Execute each step
-    for step in mount_steps:
-        action = step["action"]
-        
-        if action == "mount_root":
-            # Mount root subvolume
-            options = step["options"]
-            if options == "defaults":
-                options = f"subvol={step['subvol']}"
-            else:
-                options = f"subvol={step['subvol']},{options}"
-            
-            _mount_filesystem(step["device"], step["path"], options, cmd_runner)
-            
-        elif action == "create_dirs":
-            # Create directories
-            for dir_name in step["directories"]:
-                dir_path = step["parent"] / dir_name
-                _create_directory(dir_path, cmd_runner)
-                
-        elif action == "mount":
-            # Mount a partition
-            _mount_filesystem(step["device"], step["path"], step["options"], cmd_runner)
-            
-        elif action == "create_and_mount":
-            # Create a directory and mount in one step
-            _create_directory(step["dir_path"], cmd_runner)
-            _mount_filesystem(step["device"], step["dir_path"], step["options"], cmd_runner)
-            
-        elif action == "mount_subvolumes":
-            # Mount multiple subvolumes
-            for subvol, mountpoint in step["subvolumes"].items():
-                rel_path = mountpoint.lstrip("/")
-                mount_path = step["base_path"] / rel_path
-                
-                options = step["mount_options"][mountpoint]
-                if options == "defaults":
-                    options = f"subvol={subvol}"
-                else:
-                    options = f"subvol={subvol},{options}"
-                
-                _mount_filesystem(step["device"], mount_path, options, cmd_runner)
+    def mount_entry(entry: Tuple[str, Path, str, str]) -> None:
+        device, mount_point, fstype, options = entry
+        if mount_point != target_path:
+            _create_directory(mount_point, cmd_runner)
+        _mount_filesystem(device, mount_point, fstype, options, cmd_runner)
+    
+    if cmd_runner.simulating:
+        # In simulation mode, mount sequentially to keep the output ordered
+        for entry in mounts:
+            mount_entry(entry)
+    else:
+        # Mounts at the same depth only depend on filesystems of the previous
+        # depths, so each wave is mounted in parallel, the workers spending
+        # their time in mount(2) with the GIL released
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_MOUNTS) as executor:
+            for wave in _mount_waves(mounts, target_path):
+                list(executor.map(mount_entry, wave))
     
-    logger.info(colorize("All filesystems mounted successfully", TermColors.SUCCESS, cmd_runner.colored_output))
\ No newline at end of file
+    logger.info("%sAll filesystems mounted successfully%s", cmd_runner.color_success, cmd_runner.color_reset)
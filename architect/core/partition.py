@@ -4,16 +4,21 @@ Disk partitioning module.
 This module handles disk partitioning operations using sfdisk for simpler and more
 efficient partition layout creation.
 """
+import functools
+import json
 import os
 import logging
+import platform
 import subprocess
 import time
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple
 
 from architect.utils.command import CommandRunner
-from architect.utils.format import TermColors, colorize, parse_size_spec
+from architect.utils.format import parse_size_spec
 from architect.utils.types import DiskInfo, PartitionTable
 from architect.core.exceptions import NotEnoughSpaceError, PartitioningError
+from architect.core.disk import discard_whole_disk, invalidate_disk_cache
 from architect.utils.format import bytes_to_human_readable
 
 logger = logging.getLogger('architect')
@@ -22,6 +27,56 @@ logger = logging.getLogger('architect')
 DEFAULT_SSD_OVERPROVISION = 5  # 5% for SSDs
 MIN_WINDOWS_SIZE_GIB = 21      # Minimum Windows partition size in GiB
 WINDOWS_RECOVERY_SIZE_MIB = 750  # Size for Windows Recovery partition
+UDEV_SETTLE_TIMEOUT = 1  # Seconds given to udev before polling for the partitions
+DEVICE_WAIT_TIMEOUT = 10.0  # Seconds to wait for the partition device nodes
+DEVICE_POLL_INTERVAL = 0.05  # Seconds between polls for the partition device nodes
+
+# sfdisk script lines for each partition, sizes and types are filled in with str.format
+SFDISK_EFI_LINE = 'size=550MiB, type=U, attrs=RequiredPartition, name="EFI System"'
+SFDISK_MSR_LINE = 'size=16MiB, type=E3C9E316-0B5C-4DB8-817D-F92DF00215AE, name="Microsoft reserved"'
+SFDISK_WINDOWS_LINE = 'size={size}, type=EBD0A0A2-B9E5-4433-87C0-68B6B72699C7, name="Windows"'
+SFDISK_RECOVERY_LINE = (f'size={WINDOWS_RECOVERY_SIZE_MIB}MiB, type=DE94BBA4-06D1-4D40-A16A-BFD50179D6AC, '
+                        'attrs=RequiredPartition,63, name="Windows Recovery"')
+SFDISK_BOOT_LINE = 'size=1GiB, type=L, name="Linux boot"'
+SFDISK_ROOT_LINE = 'size={size}, type={type}, name="Linux root"'
+
+# Root partition type based on architecture
+ROOT_PARTITION_TYPES = {
+    "x86_64": "4F68BCE3-E8CD-4DB1-96E7-FBCAF984B709",  # Linux root (x86-64)
+    "arm64": "B921B045-1DF0-41C3-AF44-4C6F280D3FAE",   # Linux root (ARM64)
+    "ia64": "993D8D3D-F80E-4225-855A-9DAF8ED7EA97",    # Linux root (IA-64)
+    "arm": "69DAD710-2CE4-4E3C-B16C-21A1D49ABED3",     # Linux root (32-bit ARM)
+    "x86": "44479540-F297-41B2-9AF7-D131D5F0458A"      # Linux root (32-bit x86)
+}
+
+# Machine names reported by the kernel, mapped to normalized architecture names
+_ARCH_ALIASES = {
+    "amd64": "x86_64",
+    "aarch64": "arm64",
+    "i386": "x86",
+    "i486": "x86",
+    "i586": "x86",
+    "i686": "x86",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _partition_prefix(disk: str) -> str:
+    """
+    Get the prefix of the partition device names of a disk.
+    
+    Args:
+        disk: Path to the disk device
+        
+    Returns:
+        Partition device path without the partition number
+    """
+    # Like the kernel, separate the partition number with a "p" when the disk
+    # name ends with a digit (nvme0n1p1, mmcblk0p1, loop0p1), not otherwise (sda1)
+    name = os.path.basename(disk)
+    if name and name[-1].isdigit():
+        return f"{disk}p"
+    return disk
 
 
 def get_partition_device_name(disk: str, partition_number: int) -> str:
@@ -35,12 +90,25 @@ def get_partition_device_name(disk: str, partition_number: int) -> str:
     Returns:
         Partition device path
     """
-    # Check if this is an NVMe disk
-    if "nvme" in disk.lower():
-        return f"{disk}p{partition_number}"
-    # Otherwise, assume standard disk naming convention
-    else:
-        return f"{disk}{partition_number}"
+    return f"{_partition_prefix(disk)}{partition_number}"
+
+
+@functools.lru_cache(maxsize=None)
+def _detect_host_arch() -> str:
+    """
+    Detect the architecture of the running system, normalized to the names
+    used for GPT root partition types.
+    
+    Returns:
+        Normalized architecture name
+    """
+    arch = platform.machine().lower()
+    arch = _ARCH_ALIASES.get(arch, arch)
+    
+    if arch.startswith("arm") and arch != "arm64":
+        arch = "arm64" if "64" in arch else "arm"
+    
+    return arch
 
 
 def get_architecture_specific_partition_type(args: Any) -> str:
@@ -58,38 +126,64 @@ def get_architecture_specific_partition_type(args: Any) -> str:
     if args.hardware_encryption or args.software_encryption:
         return "CA7D7CCB-63ED-4C53-861C-1742536059CC"  # LUKS
         
-    # Root partition type based on architecture
-    arch_partition_types = {
-        "x86_64": "4F68BCE3-E8CD-4DB1-96E7-FBCAF984B709",  # Linux root (x86-64)
-        "arm64": "B921B045-1DF0-41C3-AF44-4C6F280D3FAE",   # Linux root (ARM64)
-        "ia64": "993D8D3D-F80E-4225-855A-9DAF8ED7EA97",    # Linux root (IA-64)
-        "arm": "69DAD710-2CE4-4E3C-B16C-21A1D49ABED3",     # Linux root (32-bit ARM)
-        "x86": "44479540-F297-41B2-9AF7-D131D5F0458A"      # Linux root (32-bit x86)
-    }
-    
     # Use forced architecture if specified
-    if hasattr(args, 'target_arch') and args.target_arch:
-        arch = args.target_arch
-    else:
-        # Detect current architecture
-        import platform
-        arch = platform.machine().lower()
-        
-        # Normalize detected architecture
-        if arch in ("x86_64", "amd64"):
-            arch = "x86_64"
-        elif arch in ("aarch64"):
-            arch = "arm64"
-        elif arch in ("i386", "i486", "i586", "i686"):
-            arch = "x86"
-        elif arch.startswith("arm"):
-            if "64" in arch:
-                arch = "arm64"
-            else:
-                arch = "arm"
+    arch = getattr(args, 'target_arch', None) or _detect_host_arch()
     
     # Return appropriate type or default to generic Linux type if not recognized
-    return arch_partition_types.get(arch, "0FC63DAF-8483-4772-8E79-3D69D8477DE4")
+    return ROOT_PARTITION_TYPES.get(arch, "0FC63DAF-8483-4772-8E79-3D69D8477DE4")
+
+
+def _has_signatures(disk: str, cmd_runner: CommandRunner) -> bool:
+    """
+    Check whether the disk holds any filesystem, RAID or partition table signature.
+    
+    Args:
+        disk: Path to the disk device
+        cmd_runner: CommandRunner instance for executing commands
+        
+    Returns:
+        True if signatures were found or the disk could not be probed, False if it is blank
+    """
+    # Without real disk information, assume the disk has to be wiped
+    if cmd_runner.simulating and not cmd_runner.use_real_disk_info:
+        return True
+    
+    # Use appropriate command function based on mode
+    cmd_func = (cmd_runner.run_real if cmd_runner.simulating
+                else cmd_runner.run)
+    
+    try:
+        # Read-only listing of the signatures wipefs -a would erase
+        result = cmd_func(["wipefs", "--no-act", "--json", disk], check=False)
+        if result.returncode != 0:
+            logger.debug(f"Could not probe signatures on {disk}, wiping anyway: {result.stderr}")
+            return True
+        output = result.stdout.strip()
+        return bool(output) and bool(json.loads(output).get("signatures"))
+    except Exception as e:
+        logger.debug(f"Could not probe signatures on {disk}, wiping anyway: {e}")
+        return True
+
+
+def _wait_for_devices(devices: List[str], timeout: float = DEVICE_WAIT_TIMEOUT) -> None:
+    """
+    Wait for device nodes to appear by polling just those paths.
+    
+    Args:
+        devices: Paths of the device nodes to wait for
+        timeout: Maximum time to wait in seconds
+        
+    Raises:
+        PartitioningError: If some device nodes are still missing after the timeout
+    """
+    deadline = time.monotonic() + timeout
+    missing = [device for device in devices if not os.path.exists(device)]
+    
+    while missing:
+        if time.monotonic() >= deadline:
+            raise PartitioningError(f"Partition devices did not appear: {', '.join(missing)}")
+        time.sleep(DEVICE_POLL_INTERVAL)
+        missing = [device for device in missing if not os.path.exists(device)]
 
 
 def prepare_disk(disk: str, disk_info: DiskInfo, args: Any, cmd_runner: CommandRunner) -> PartitionTable:
@@ -109,14 +203,22 @@ def prepare_disk(disk: str, disk_info: DiskInfo, args: Any, cmd_runner: CommandR
         PartitioningError: If there's an error in partitioning
         NotEnoughSpaceError: If not enough space for Windows partition
     """
-    logger.info(colorize(f"Preparing disk {disk}", TermColors.INFO, cmd_runner.colored_output))
+    logger.info("%sPreparing disk %s%s", cmd_runner.color_info, disk, cmd_runner.color_reset)
     
-    # Wipe the disk
-    logger.info("Wiping disk")
-    try:
-        cmd_runner.run(["wipefs", "-a", disk])
-    except subprocess.CalledProcessError as e:
-        raise PartitioningError(f"Failed to wipe disk: {e}")
+    # Wipe the disk, unless it is already blank
+    if _has_signatures(disk, cmd_runner):
+        logger.info("Wiping disk")
+        try:
+            cmd_runner.run(["wipefs", "-a", disk])
+        except subprocess.CalledProcessError as e:
+            raise PartitioningError(f"Failed to wipe disk: {e}")
+    else:
+        logger.info("Disk has no signatures, skipping wipe")
+    
+    # Give the whole SSD back to the controller before laying out partitions
+    if not disk_info["rotational"] and disk_info.get("trim_supported", False):
+        logger.info("Discarding all blocks on the SSD")
+        disk_info["discarded"] = discard_whole_disk(disk, disk_info["size_bytes"], cmd_runner)
     
     # Create the partition table using sfdisk
     logger.info("Creating GPT partition table using sfdisk")
@@ -143,9 +245,12 @@ def prepare_disk(disk: str, disk_info: DiskInfo, args: Any, cmd_runner: CommandR
     # Add Windows partitions if requested and calculate remaining space
     if args.windows:
         try:
+            # Parse the size once, sfdisk gets the same size in whole MiB
+            windows_mib = parse_size_spec(args.windows, available_size) // (1024 * 1024)
+            windows_bytes = windows_mib * 1024 * 1024
+            windows_gib = windows_mib / 1024
+            
             # Check if minimum size is met
-            windows_bytes = parse_size_spec(args.windows, available_size)
-            windows_gib = windows_bytes / (1024**3)
             
             if windows_gib < MIN_WINDOWS_SIZE_GIB:
                 raise NotEnoughSpaceError(
@@ -176,15 +281,15 @@ def prepare_disk(disk: str, disk_info: DiskInfo, args: Any, cmd_runner: CommandR
     # Always add the EFI partition (shared between Windows and Linux)
     efi_size = 550 * 1024 * 1024  # 550 MiB
     available_size -= efi_size
-    script_lines.append("size=550MiB, type=U, attrs=RequiredPartition, name=\"EFI System\"")
+    script_lines.append(SFDISK_EFI_LINE)
     
     # Add Windows partitions if requested
     if args.windows:
         # Windows partitions group
         script_lines.append("# Windows partitions")
-        script_lines.append("size=16MiB, type=E3C9E316-0B5C-4DB8-817D-F92DF00215AE, name=\"Microsoft reserved\"")
-        script_lines.append(f"size={args.windows}, type=EBD0A0A2-B9E5-4433-87C0-68B6B72699C7, name=\"Windows\"")
-        script_lines.append(f"size={WINDOWS_RECOVERY_SIZE_MIB}MiB, type=DE94BBA4-06D1-4D40-A16A-BFD50179D6AC, attrs=RequiredPartition,63, name=\"Windows Recovery\"")
+        script_lines.append(SFDISK_MSR_LINE)
+        script_lines.append(SFDISK_WINDOWS_LINE.format(size=f"{windows_mib}MiB"))
+        script_lines.append(SFDISK_RECOVERY_LINE)
             
     # Get architecture-specific partition type
     system_partition_type = get_architecture_specific_partition_type(args)
@@ -205,24 +310,23 @@ def prepare_disk(disk: str, disk_info: DiskInfo, args: Any, cmd_runner: CommandR
 
     # Add Linux partitions
     script_lines.append("# Linux partitions")
-    script_lines.append("size=1GiB, type=L, name=\"Linux boot\"")
+    script_lines.append(SFDISK_BOOT_LINE)
     
     # If overprovisioning is used, specify exact size for system partition instead of using all remaining space
     if overprovision_size:
-        system_size_spec = f"size={bytes_to_human_readable(available_size)}"
-        script_lines.append(f"{system_size_spec}, type={system_partition_type}, name=\"Linux root\"")
+        system_size = f"{available_size // (1024 * 1024)}MiB"
+        script_lines.append(SFDISK_ROOT_LINE.format(size=system_size, type=system_partition_type))
         script_lines.append(f"# Unallocated space for SSD overprovisioning: {bytes_to_human_readable(overprovision_size)}")
     else:
         # Use all remaining space for system partition
-        script_lines.append(f"size=+, type={system_partition_type}, name=\"Linux root\"")
+        script_lines.append(SFDISK_ROOT_LINE.format(size="+", type=system_partition_type))
     
     # Join the script lines
     script = "\n".join(script_lines)
     
-    # Log the script
-    logger.info("Applying partition table:")
-    for line in script_lines:
-        logger.info(f"  {line}")
+    # Log the script as a single record
+    logger.info("Applying partition table:\n%s", 
+                "\n".join(f"  {line}" for line in script_lines))
     
     # Apply the partitioning
     try:
@@ -230,30 +334,68 @@ def prepare_disk(disk: str, disk_info: DiskInfo, args: Any, cmd_runner: CommandR
     except subprocess.CalledProcessError as e:
         raise PartitioningError(f"Failed to create partition table: {e}")
     
-    # Allow kernel to process the new partition table
-    try:
-        cmd_runner.run(["udevadm", "settle"])
-    except subprocess.CalledProcessError as e:
-        logger.warning(colorize(f"udevadm settle failed, but continuing: {e}", 
-                               TermColors.WARNING, cmd_runner.colored_output))
-        # Sleep a bit to give the kernel time to recognize partitions
-        time.sleep(2)
+    # The partition table changed, previously gathered disk info is stale
+    invalidate_disk_cache(disk, cmd_runner)
     
     # Map partition roles to device paths
-    partitions: PartitionTable = {}
+    prefix = _partition_prefix(disk)
+    partitions: PartitionTable
     
     if args.windows:
-        partitions["efi"] = get_partition_device_name(disk, 1)
-        partitions["msr"] = get_partition_device_name(disk, 2)
-        partitions["windows"] = get_partition_device_name(disk, 3)
-        partitions["recovery"] = get_partition_device_name(disk, 4)
-        partitions["boot"] = get_partition_device_name(disk, 5)
-        partitions["system"] = get_partition_device_name(disk, 6)
+        partitions = {
+            "efi": f"{prefix}1",
+            "msr": f"{prefix}2",
+            "windows": f"{prefix}3",
+            "recovery": f"{prefix}4",
+            "boot": f"{prefix}5",
+            "system": f"{prefix}6",
+        }
     else:
-        partitions["efi"] = get_partition_device_name(disk, 1)
-        partitions["boot"] = get_partition_device_name(disk, 2)
-        partitions["system"] = get_partition_device_name(disk, 3)
+        partitions = {
+            "efi": f"{prefix}1",
+            "boot": f"{prefix}2",
+            "system": f"{prefix}3",
+        }
+    
+    # Give udev a short chance to process the new partition table, without
+    # waiting for every pending event in the system
+    try:
+        cmd_runner.run(["udevadm", "settle", f"--timeout={UDEV_SETTLE_TIMEOUT}"])
+    except subprocess.CalledProcessError as e:
+        logger.debug(f"udevadm settle did not complete, polling for the partitions: {e}")
+    
+    # Wait for the kernel to create the partition device nodes we need
+    if not cmd_runner.simulating:
+        _wait_for_devices(list(partitions.values()))
+    
+    logger.info("%sPartitioning completed successfully%s", cmd_runner.color_success, cmd_runner.color_reset)
+    return partitions
+
+
+def prepare_disks(disks: List[Tuple[str, DiskInfo]], args: Any, cmd_runner: CommandRunner) -> Dict[str, PartitionTable]:
+    """
+    Prepare several disks, in parallel as each of them only touches its own devices.
+    
+    Args:
+        disks: List of (disk path, disk info) pairs
+        args: Command line arguments
+        cmd_runner: CommandRunner instance for executing commands
+        
+    Returns:
+        Dict mapping disk paths to their partition tables
+        
+    Raises:
+        PartitioningError: If there's an error in partitioning
+        NotEnoughSpaceError: If not enough space for Windows partition
+    """
+    if cmd_runner.simulating or len(disks) <= 1:
+        # In simulation mode, prepare the disks sequentially to keep the output ordered
+        return {disk: prepare_disk(disk, disk_info, args, cmd_runner) for disk, disk_info in disks}
     
-    logger.info(colorize("Partitioning completed successfully", 
-                        TermColors.SUCCESS, cmd_runner.colored_output))
-    return partitions
\ No newline at end of file
+    # The workers spend their time waiting on wipefs and sfdisk with the GIL released
+    with ThreadPoolExecutor(max_workers=len(disks)) as executor:
+        futures = {
+            disk: executor.submit(prepare_disk, disk, disk_info, args, cmd_runner)
+            for disk, disk_info in disks
+        }
+        return {disk: future.result() for disk, future in futures.items()}
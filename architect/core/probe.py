@@ -0,0 +1,52 @@
+"""
+System probing module.
+
+This module gathers everything that has to be checked on the host before the
+disk is touched (tools, permissions, encryption support and disk information)
+in a single pass.
+"""
+import logging
+from typing import Any
+
+from architect.utils.command import CommandRunner
+from architect.utils.types import DiskInfo
+from architect.utils.validation import check_prerequisites, normalize_encryption_args, validate_encryption_requirements
+from architect.core.disk import get_disk_info
+
+logger = logging.getLogger('architect')
+
+
+def probe_system(args: Any, cmd_runner: CommandRunner) -> DiskInfo:
+    """
+    Check prerequisites and encryption requirements, then gather disk information.
+    
+    Args:
+        args: Command line arguments
+        cmd_runner: CommandRunner instance for executing commands
+    
+    Returns:
+        DiskInfo object containing disk information
+    
+    Raises:
+        RuntimeError: If prerequisites are not met
+        EncryptionError: If encryption requirements are not met
+        DiskNotFoundError: If disk is not found
+    """
+    use_real_disk_info = cmd_runner.simulating and cmd_runner.use_real_disk_info
+    
+    # Check required tools and permissions
+    check_prerequisites(cmd_runner, use_real_disk_info)
+    
+    # Normalize and validate encryption arguments
+    normalize_encryption_args(args)
+    validate_encryption_requirements(args, cmd_runner)
+    
+    # Get disk info
+    disk_info = get_disk_info(args.disk, cmd_runner)
+    
+    # Force TRIM support if requested and disk is SSD
+    if args.force_discard and not disk_info["rotational"]:
+        logger.info("Forcing TRIM/discard support as requested by --force-discard")
+        disk_info["trim_supported"] = True
+    
+    return disk_info
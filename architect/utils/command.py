@@ -3,18 +3,73 @@ Command execution utilities.
 
 This module provides tools for executing shell commands with simplified simulation support.
 """
+import copy
+import functools
 import logging
 import os
+import shlex
 import shutil
 import subprocess
+import sys
 import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Dict, List, Optional, Any, Set
+from typing import Callable, ClassVar, Dict, List, Optional, Any, Set, Tuple
 
-from architect.utils.format import TermColors, colorize
+from architect.utils.format import TermColors, parse_size_spec
 
 logger = logging.getLogger('architect')
 
+# Maximum number of commands run_many executes at the same time
+MAX_PARALLEL_COMMANDS = 8
+
+# Rules framing the simulation report and its command groups
+_REPORT_RULE = "=" * 80
+_REPORT_SEPARATOR = "-" * 80
+_GROUP_RULE = "-" * 40
+
+
+@functools.lru_cache(maxsize=None)
+def find_tool(tool: str) -> Optional[str]:
+    """
+    Locate an executable in PATH, caching the result for the process lifetime.
+    
+    Args:
+        tool: Name of the executable
+        
+    Returns:
+        Absolute path of the executable, or None if it is not installed
+    """
+    return shutil.which(tool)
+
+
+def _parse_flags(cmd: List[str]) -> Tuple[Dict[str, Any], str]:
+    """
+    Parse the arguments of a command once, for the simulation handlers.
+    
+    A flag followed by an argument that is not itself a flag takes it as its
+    value, other flags are set to True. A repeated flag keeps its last value.
+    
+    Args:
+        cmd: Command as list of strings
+        
+    Returns:
+        Tuple of (dict mapping flags to their value, last argument of the command)
+    """
+    opts: Dict[str, Any] = {}
+    i = 1
+    while i < len(cmd):
+        arg = cmd[i]
+        if arg.startswith("-") and i + 1 < len(cmd) and not cmd[i + 1].startswith("-"):
+            opts[arg] = cmd[i + 1]
+            i += 2
+        else:
+            opts[arg] = True
+            i += 1
+    
+    return opts, cmd[-1] if cmd else ""
+
 
 class SimulationMode(Enum):
     """Enumeration for simulation modes"""
@@ -27,6 +82,10 @@ class CommandRunner:
     Class responsible for command execution with simulation support.
     Acts as a wrapper around subprocess.run with additional functionality.
     """
+    # Read-only introspection commands whose results are reused until a
+    # command that may change the disks is executed
+    CACHEABLE_COMMANDS = frozenset({"blkid", "lsblk", "blockdev"})
+    
     def __init__(self, simulation_mode: SimulationMode, colored_output: bool = True):
         """
         Initialize the command runner.
@@ -36,19 +95,42 @@ class CommandRunner:
             colored_output: Whether to use colored output in terminal
         """
         self.simulation_mode = simulation_mode
+        # Resolved once so hot paths test a plain bool instead of comparing enums
+        self.simulating = simulation_mode == SimulationMode.SIMULATE
         self.colored_output = colored_output
         self.commands_run = []
         
+        # Precomputed color sequences, empty when colors are disabled, so that
+        # log calls can pass them as lazy %-format arguments
+        self.color_info = TermColors.INFO if colored_output else ""
+        self.color_success = TermColors.SUCCESS if colored_output else ""
+        self.color_warning = TermColors.WARNING if colored_output else ""
+        self.color_error = TermColors.ERROR if colored_output else ""
+        self.color_sim = TermColors.SIM if colored_output else ""
+        self.color_reset = TermColors.ENDC if colored_output else ""
+        
         # Generate a unique simulation ID
-        self.simulation_id = str(uuid.uuid4())[:8]
+        self.simulation_id = uuid.uuid4().hex[:8]
+        
+        # Tag prepended to every simulated command log line
+        self.sim_prefix = f"{self.color_sim}[SIM:{self.simulation_id}]{self.color_reset}"
         
-        # Keep track of simulated UUIDs for consistency
-        self.simulated_uuids = {}
-        self.simulated_partuuids = {}
+        # Keep track of simulated UUIDs and PARTUUIDs for consistency, keyed by
+        # (device, tag); setdefault keeps them consistent across threads too
+        self.simulated_ids: Dict[Tuple[str, str], str] = {}
         
         # Simulation parameters
         self.simulation_params = {}
         self.use_real_disk_info = False
+        
+        # Bulk lsblk listing of all disks, keyed by kernel name (None until loaded)
+        self.block_devices: Optional[Dict[str, Dict[str, Any]]] = None
+        
+        # Results of executed introspection commands, keyed by (command, text mode)
+        self.probe_cache: Dict[Tuple[Tuple[str, ...], bool], subprocess.CompletedProcess] = {}
+        
+        # Worker pool for run_many, created on first use
+        self._executor: Optional[ThreadPoolExecutor] = None
 
     def set_simulation_params(self, params: Dict[str, Any]) -> None:
         """
@@ -59,6 +141,60 @@ class CommandRunner:
         """
         self.simulation_params = params
 
+    def _exec(self, cmd: List[str], check: bool, label: str, **kwargs) -> subprocess.CompletedProcess:
+        """
+        Execute a command for real, logging the details if it fails.
+        
+        Args:
+            cmd: Command to run as list of strings
+            check: Whether to check for non-zero return code
+            label: How the command is named in the failure log
+            **kwargs: Additional arguments to pass to subprocess.run
+            
+        Returns:
+            CompletedProcess instance from subprocess.run
+        """
+        try:
+            return self._run_cached(cmd, check, **kwargs)
+            
+        except subprocess.CalledProcessError as e:
+            if logger.isEnabledFor(logging.ERROR):
+                logger.error("%s%s failed: %s%s", self.color_error, label, ' '.join(cmd), self.color_reset)
+                logger.error("Return code: %d", e.returncode)
+                logger.error("Stdout: %s", e.stdout)
+                logger.error("Stderr: %s", e.stderr)
+            raise
+
+    def _run_cached(self, cmd: List[str], check: bool, **kwargs) -> subprocess.CompletedProcess:
+        """
+        Execute a command, reusing the result of an identical introspection command.
+        
+        Args:
+            cmd: Command to run as list of strings
+            check: Whether to check for non-zero return code
+            **kwargs: Additional arguments to pass to subprocess.run
+            
+        Returns:
+            CompletedProcess instance from subprocess.run
+        """
+        if not cmd or os.path.basename(cmd[0]) not in self.CACHEABLE_COMMANDS or "input" in kwargs:
+            # Anything else may change the disks
+            if not self.simulating:
+                self.probe_cache.clear()
+            return subprocess.run(cmd, check=check, capture_output=True, **kwargs)
+        
+        key = (tuple(cmd), kwargs["text"])
+        cached = self.probe_cache.get(key)
+        if cached is not None:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Reusing cached result of: %s", ' '.join(cmd))
+            return copy.copy(cached)
+        
+        result = subprocess.run(cmd, check=check, capture_output=True, **kwargs)
+        if result.returncode == 0:
+            self.probe_cache[key] = copy.copy(result)
+        return result
+
     def run(self, cmd: List[str], check: bool = True, **kwargs) -> subprocess.CompletedProcess:
         """
         Run a shell command or simulate running it.
@@ -66,46 +202,64 @@ class CommandRunner:
         Args:
             cmd: Command to run as list of strings
             check: Whether to check for non-zero return code
-            **kwargs: Additional arguments to pass to subprocess.run
+            **kwargs: Additional arguments to pass to subprocess.run (text mode unless text=False)
             
         Returns:
             CompletedProcess instance from subprocess.run
         """
-        cmd_str = ' '.join(cmd)
-        logger.debug(f"Command requested: {cmd_str}")
+        kwargs.setdefault("text", True)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Command requested: %s", ' '.join(cmd))
         
-        # Keep track of this command
+        # Keep track of this command (callers do not modify submitted commands)
+        # Interned so that handler and report lookups compare by identity
+        cmd_name = sys.intern(os.path.basename(cmd[0])) if cmd else "unknown"
         cmd_record = {
-            "command": cmd.copy(),
-            "simulated": self.simulation_mode == SimulationMode.SIMULATE
+            "command": cmd,
+            "basename": cmd_name,
+            "simulated": self.simulating
         }
         self.commands_run.append(cmd_record)
         
         # For simulation mode
-        if self.simulation_mode == SimulationMode.SIMULATE:
-            sim_prefix = colorize(f"[SIM:{self.simulation_id}]", TermColors.SIM, self.colored_output)
-            logger.info(f"{sim_prefix} Would execute: {cmd_str}")
+        if self.simulating:
+            # Rendered once, for both this log line and the simulation report
+            cmd_str = cmd_record["cmd_str"] = shlex.join(cmd)
+            logger.info("%s Would execute: %s", self.sim_prefix, cmd_str)
             
             # Create a simulated completed process
-            return self._simulate_command(cmd, **kwargs)
+            return self._simulate_command(cmd, cmd_name, **kwargs)
             
         # For real execution mode
-        try:
-            result = subprocess.run(
-                cmd,
-                check=check,
-                text=True,
-                capture_output=True,
-                **kwargs
-            )
-            return result
+        return self._exec(cmd, check, "Command", **kwargs)
+
+    def run_many(self, cmds: List[List[str]], check: bool = True, real: bool = False, 
+                 **kwargs) -> List[subprocess.CompletedProcess]:
+        """
+        Run independent commands concurrently.
+        
+        The commands must not depend on each other's effects, since they run in
+        no particular order; this is meant for read-only probes across disks.
+        
+        Args:
+            cmds: Commands to run, each as list of strings
+            check: Whether to check for non-zero return code
+            real: Whether to run the commands for real even in simulation mode
+            **kwargs: Additional arguments to pass to subprocess.run
             
-        except subprocess.CalledProcessError as e:
-            logger.error(colorize(f"Command failed: {cmd_str}", TermColors.ERROR, self.colored_output))
-            logger.error(f"Return code: {e.returncode}")
-            logger.error(f"Stdout: {e.stdout}")
-            logger.error(f"Stderr: {e.stderr}")
-            raise
+        Returns:
+            CompletedProcess instances, in the order of the commands
+            
+        Raises:
+            subprocess.CalledProcessError: If check is set and a command fails
+        """
+        run = self.run_real if real else self.run
+        if len(cmds) < 2:
+            return [run(cmd, check=check, **kwargs) for cmd in cmds]
+        
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_COMMANDS)
+        return list(self._executor.map(lambda cmd: run(cmd, check=check, **kwargs), cmds))
 
     def run_real(self, cmd: List[str], check: bool = True, **kwargs) -> subprocess.CompletedProcess:
         """
@@ -115,38 +269,25 @@ class CommandRunner:
         Args:
             cmd: Command to run as list of strings
             check: Whether to check for non-zero return code
-            **kwargs: Additional arguments to pass to subprocess.run
+            **kwargs: Additional arguments to pass to subprocess.run (text mode unless text=False)
             
         Returns:
             CompletedProcess instance from subprocess.run
         """
-        cmd_str = ' '.join(cmd)
-        logger.debug(f"Running real command: {cmd_str}")
+        kwargs.setdefault("text", True)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Running real command: %s", ' '.join(cmd))
         
         # Execute the command for real
-        try:
-            result = subprocess.run(
-                cmd,
-                check=check,
-                text=True,
-                capture_output=True,
-                **kwargs
-            )
-            return result
-            
-        except subprocess.CalledProcessError as e:
-            logger.error(colorize(f"Real command failed: {cmd_str}", TermColors.ERROR, self.colored_output))
-            logger.error(f"Return code: {e.returncode}")
-            logger.error(f"Stdout: {e.stdout}")
-            logger.error(f"Stderr: {e.stderr}")
-            raise
+        return self._exec(cmd, check, "Real command", **kwargs)
 
-    def _simulate_command(self, cmd: List[str], **kwargs) -> subprocess.CompletedProcess:
+    def _simulate_command(self, cmd: List[str], cmd_name: str, **kwargs) -> subprocess.CompletedProcess:
         """
         Generate simulated output for a command.
         
         Args:
             cmd: Command to simulate
+            cmd_name: Base name of the command executable
             **kwargs: Additional arguments passed to the original command
             
         Returns:
@@ -160,64 +301,76 @@ class CommandRunner:
             stderr=""
         )
         
-        # Get command base name 
-        cmd_name = os.path.basename(cmd[0]) if cmd else ""
-        
         # Handle common commands by name
-        if cmd_name == "blkid":
-            return self._handle_blkid_simulation(cmd, result)
-        elif cmd_name == "blockdev":
-            return self._handle_blockdev_simulation(cmd, result)
-        elif cmd_name == "lsblk":
-            return self._handle_lsblk_simulation(cmd, result)
-        elif cmd_name == "cryptsetup":
-            return self._handle_cryptsetup_simulation(cmd, result)
-        elif cmd_name == "hdparm":
-            return self._handle_hdparm_simulation(cmd, result)
-        elif cmd_name == "sfdisk":
-            return self._handle_sfdisk_simulation(cmd, result, **kwargs)
+        handler = self._SIM_HANDLERS.get(cmd_name)
+        if handler is not None:
+            return handler(self, cmd, result, **kwargs)
         
         # Handle other commands with input if relevant
         if "input" in kwargs:
-            logger.debug(f"Command input: {kwargs['input']}")
+            logger.debug("Command input: %s", kwargs['input'])
         
         return result
     
-    def _handle_blkid_simulation(self, cmd: List[str], result: subprocess.CompletedProcess) -> subprocess.CompletedProcess:
+    def _handle_blkid_simulation(self, cmd: List[str], result: subprocess.CompletedProcess, **kwargs) -> subprocess.CompletedProcess:
         """Simulate blkid command output"""
-        try:
-            if "-s" in cmd and len(cmd) > cmd.index("-s") + 1:
-                param_type = cmd[cmd.index("-s") + 1]
-                device_path = cmd[-1]
-                
-                # Generate UUID or PARTUUID based on request
-                if param_type == "UUID":
-                    # Generate consistent UUID for the same device
-                    if device_path not in self.simulated_uuids:
-                        self.simulated_uuids[device_path] = str(uuid.uuid4())
-                    
-                    result.stdout = self.simulated_uuids[device_path] + "\n"
-                    
-                elif param_type == "PARTUUID":
-                    # Generate consistent PARTUUID for the same device
-                    if device_path not in self.simulated_partuuids:
-                        self.simulated_partuuids[device_path] = str(uuid.uuid4())
-                    
-                    result.stdout = self.simulated_partuuids[device_path] + "\n"
-        except Exception:
-            # In case of any error, return generic UUID
-            result.stdout = str(uuid.uuid4()) + "\n"
+        opts, device_path = _parse_flags(cmd)
+        if opts.get("-o") == "export":
+            return self._handle_blkid_export_simulation(cmd, result)
+        
+        # Generate consistent UUID or PARTUUID for the same device
+        param_type = opts.get("-s")
+        if param_type in ("UUID", "PARTUUID"):
+            result.stdout = self._simulated_id(device_path, param_type) + "\n"
+        
+        return result
+    
+    def _simulated_id(self, device_path: str, tag: str) -> str:
+        """
+        Get the simulated identifier of a device, generating it on first use.
+        
+        Args:
+            device_path: Path of the device
+            tag: Identifier type (UUID or PARTUUID)
             
+        Returns:
+            Simulated identifier, stable for the whole run
+        """
+        return self.simulated_ids.setdefault((device_path, tag), str(uuid.uuid4()))
+    
+    def _handle_blkid_export_simulation(self, cmd: List[str], result: subprocess.CompletedProcess) -> subprocess.CompletedProcess:
+        """Simulate blkid -o export output for one or more devices"""
+        tags = []
+        devices = []
+        args = iter(cmd[1:])
+        for arg in args:
+            if arg == "-s":
+                tags.append(next(args, ""))
+            elif arg in ("-c", "-o"):
+                next(args, None)
+            elif not arg.startswith("-"):
+                devices.append(arg)
+        
+        blocks = []
+        for device_path in devices:
+            lines = [f"DEVNAME={device_path}"]
+            # Generate consistent identifiers for the same device
+            if not tags or "UUID" in tags:
+                lines.append(f"UUID={self._simulated_id(device_path, 'UUID')}")
+            if not tags or "PARTUUID" in tags:
+                lines.append(f"PARTUUID={self._simulated_id(device_path, 'PARTUUID')}")
+            blocks.append("\n".join(lines) + "\n")
+        
+        result.stdout = "\n".join(blocks)
         return result
     
-    def _handle_blockdev_simulation(self, cmd: List[str], result: subprocess.CompletedProcess) -> subprocess.CompletedProcess:
+    def _handle_blockdev_simulation(self, cmd: List[str], result: subprocess.CompletedProcess, **kwargs) -> subprocess.CompletedProcess:
         """Simulate blockdev command output"""
-        if "--getsize64" in cmd:
+        opts, _ = _parse_flags(cmd)
+        if "--getsize64" in opts:
             # Check if we have a disk size parameter
             if "disk_size" in self.simulation_params:
                 # Try to parse the size
-                from architect.utils.format import parse_size_spec
-                
                 size_spec = self.simulation_params["disk_size"]
                 # Estimation for the parsing
                 total_size = 10 * 1024**4  # 10 TiB as reference
@@ -233,13 +386,18 @@ class CommandRunner:
         
         return result
     
-    def _handle_lsblk_simulation(self, cmd: List[str], result: subprocess.CompletedProcess) -> subprocess.CompletedProcess:
+    def _handle_lsblk_simulation(self, cmd: List[str], result: subprocess.CompletedProcess, **kwargs) -> subprocess.CompletedProcess:
         """Simulate lsblk command output"""
+        opts, _ = _parse_flags(cmd)
+        columns = opts.get("-o")
+        if not isinstance(columns, str):
+            return result
+        
         # If checking disk type
-        if "-o" in cmd and "TYPE" in cmd[cmd.index("-o") + 1]:
+        if "TYPE" in columns:
             result.stdout = "disk\n"
         # If checking disk model
-        elif "-o" in cmd and "MODEL" in cmd[cmd.index("-o") + 1]:
+        elif "MODEL" in columns:
             if "disk_type" in self.simulation_params:
                 disk_type = self.simulation_params["disk_type"].upper()
                 result.stdout = f"SIMULATED {disk_type} DISK\n"
@@ -248,16 +406,18 @@ class CommandRunner:
         
         return result
     
-    def _handle_cryptsetup_simulation(self, cmd: List[str], result: subprocess.CompletedProcess) -> subprocess.CompletedProcess:
+    def _handle_cryptsetup_simulation(self, cmd: List[str], result: subprocess.CompletedProcess, **kwargs) -> subprocess.CompletedProcess:
         """Simulate cryptsetup command output"""
-        if "--version" in cmd:
+        opts, _ = _parse_flags(cmd)
+        if "--version" in opts:
             result.stdout = "cryptsetup 2.6.1\n"
         
         return result
     
-    def _handle_hdparm_simulation(self, cmd: List[str], result: subprocess.CompletedProcess) -> subprocess.CompletedProcess:
+    def _handle_hdparm_simulation(self, cmd: List[str], result: subprocess.CompletedProcess, **kwargs) -> subprocess.CompletedProcess:
         """Simulate hdparm command output"""
-        if "-I" in cmd:
+        opts, _ = _parse_flags(cmd)
+        if "-I" in opts:
             # Simulate TRIM support based on parameters
             if "trim_supported" in self.simulation_params:
                 if self.simulation_params["trim_supported"]:
@@ -270,16 +430,36 @@ class CommandRunner:
         
         return result
     
+    def _handle_btrfs_simulation(self, cmd: List[str], result: subprocess.CompletedProcess, **kwargs) -> subprocess.CompletedProcess:
+        """Simulate btrfs command output"""
+        if cmd[1:3] == ["subvolume", "show"]:
+            # The first subvolume created on a fresh filesystem gets ID 256
+            subvol_name = os.path.basename(cmd[-1])
+            result.stdout = f"{subvol_name}\n\tName: \t\t\t{subvol_name}\n\tSubvolume ID: \t\t256\n"
+        
+        return result
+    
     def _handle_sfdisk_simulation(self, cmd: List[str], result: subprocess.CompletedProcess, **kwargs) -> subprocess.CompletedProcess:
         """Simulate sfdisk command output"""
         # If command has input, it's likely creating a partition table
         if "input" in kwargs:
             input_text = kwargs["input"]
-            logger.debug(f"sfdisk script:\n{input_text}")
+            logger.debug("sfdisk script:\n%s", input_text)
             result.stdout = "Created a new disklabel (gpt)\nThe new table will be used at the next reboot\nPartitioning completed successfully\n"
         
         return result
     
+    # Simulation handlers, keyed by command base name
+    _SIM_HANDLERS: ClassVar[Dict[str, Callable[..., subprocess.CompletedProcess]]] = {
+        "blkid": _handle_blkid_simulation,
+        "blockdev": _handle_blockdev_simulation,
+        "lsblk": _handle_lsblk_simulation,
+        "cryptsetup": _handle_cryptsetup_simulation,
+        "hdparm": _handle_hdparm_simulation,
+        "sfdisk": _handle_sfdisk_simulation,
+        "btrfs": _handle_btrfs_simulation,
+    }
+    
     def get_simulation_report(self) -> str:
         """
         Generate a report of all simulated commands.
@@ -287,41 +467,25 @@ class CommandRunner:
         Returns:
             Formatted string with report of simulated commands
         """
-        if self.simulation_mode != SimulationMode.SIMULATE:
+        if not self.simulating:
             return "Simulation mode is not active."
         
-        report = []
-        report.append("=" * 80)
-        report.append(f"SIMULATION REPORT [ID: {self.simulation_id}]")
-        report.append("=" * 80)
-        report.append("")
-        
         # Group commands by type
-        command_groups = {}
+        command_groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
         for cmd_record in self.commands_run:
-            cmd = cmd_record["command"]
-            cmd_type = os.path.basename(cmd[0]) if cmd else "unknown"
-            
-            if cmd_type not in command_groups:
-                command_groups[cmd_type] = []
-            
-            command_groups[cmd_type].append(cmd_record)
+            command_groups[cmd_record["basename"]].append(cmd_record)
+        
+        lines = [_REPORT_RULE, f"SIMULATION REPORT [ID: {self.simulation_id}]", _REPORT_RULE, ""]
         
         # Report by command type
         for cmd_type, cmd_records in command_groups.items():
-            report.append(f"{cmd_type.upper()} COMMANDS:")
-            report.append("-" * 40)
-            
-            for i, cmd_record in enumerate(cmd_records, 1):
-                cmd = cmd_record["command"]
-                cmd_str = ' '.join(cmd)
-                report.append(f"{i}. {cmd_str}")
-            
-            report.append("")
+            lines.append(f"{cmd_type.upper()} COMMANDS:")
+            lines.append(_GROUP_RULE)
+            lines.extend([f"{i}. {cmd_record['cmd_str']}" for i, cmd_record in enumerate(cmd_records, 1)])
+            lines.append("")
         
-        # Summary
-        report.append("-" * 80)
-        report.append(f"Total commands simulated: {len(self.commands_run)}")
-        report.append("=" * 80)
+        lines.append(_REPORT_SEPARATOR)
+        lines.append(f"Total commands simulated: {len(self.commands_run)}")
+        lines.append(_REPORT_RULE)
         
-        return "\n".join(report)
\ No newline at end of file
+        return "\n".join(lines)
\ No newline at end of file
@@ -7,6 +7,24 @@ and consistent terminal output formatting.
 import re
 from typing import Union, Optional
 
+# Size specification: a number followed by an optional unit (matched as a whole);
+# adjacent parts use disjoint character classes so matching never backtracks
+_SIZE_RE = re.compile(r"(\d+(?:\.\d+)?)[ \t]*([KMGTkmgt][Ii]?[Bb]?)?")
+
+# Binary units, indexed by power of 1024
+_BINARY_UNITS = ('B', 'KiB', 'MiB', 'GiB', 'TiB', 'PiB', 'EiB')
+
+# Unit multipliers, binary (powers of 1024) and decimal (powers of 1000)
+_UNIT_MULT = {
+    "K": 1024, "KIB": 1024,
+    "M": 1024**2, "MIB": 1024**2,
+    "G": 1024**3, "GIB": 1024**3,
+    "T": 1024**4, "TIB": 1024**4,
+    "KB": 1000,
+    "MB": 1000**2,
+    "GB": 1000**3,
+    "TB": 1000**4,
+}
 
 # ANSI Terminal Colors
 class TermColors:
@@ -52,12 +70,9 @@ def bytes_to_human_readable(size_bytes: int) -> str:
     if size_bytes < 1024:
         return f"{size_bytes}B"
     
-    for unit in ['KiB', 'MiB', 'GiB', 'TiB', 'PiB', 'EiB']:
-        size_bytes /= 1024
-        if size_bytes < 1024:
-            return f"{size_bytes:.2f}{unit}"
-    
-    return f"{size_bytes:.2f}EiB"
+    # Each unit is 10 bits wide, so the bit length picks the unit directly
+    index = min((int(size_bytes).bit_length() - 1) // 10, len(_BINARY_UNITS) - 1)
+    return f"{size_bytes / (1 << (index * 10)):.2f}{_BINARY_UNITS[index]}"
 
 
 def parse_size_spec(spec: str, disk_size_bytes: int) -> int:
@@ -72,38 +87,26 @@ def parse_size_spec(spec: str, disk_size_bytes: int) -> int:
         Size in bytes
     """
     if spec.endswith("%"):
-        percentage = float(spec.rstrip("%"))
+        percentage = float(spec[:-1])
         return int(disk_size_bytes * percentage / 100)
     
+    # Plain byte counts need no pattern matching
+    if spec.isascii() and spec.isdigit():
+        return int(spec)
+    
     # Parse size with unit
-    match = re.match(r"^(\d+(?:\.\d+)?)\s*([KMGT]i?B?)?$", spec, re.IGNORECASE)
+    match = _SIZE_RE.fullmatch(spec)
     if not match:
         raise ValueError(f"Invalid size specification: {spec}")
     
     value, unit = match.groups()
     value = float(value)
     
-    if not unit or unit.upper() in ("B", ""):
+    if not unit:
         return int(value)
     
-    # Binary units (powers of 1024)
-    if unit.upper() in ("KIB", "K"):
-        return int(value * 1024)
-    if unit.upper() in ("MIB", "M"):
-        return int(value * 1024**2)
-    if unit.upper() in ("GIB", "G"):
-        return int(value * 1024**3)
-    if unit.upper() in ("TIB", "T"):
-        return int(value * 1024**4)
-    
-    # Decimal units (powers of 1000)
-    if unit.upper() in ("KB"):
-        return int(value * 1000)
-    if unit.upper() in ("MB"):
-        return int(value * 1000**2)
-    if unit.upper() in ("GB"):
-        return int(value * 1000**3)
-    if unit.upper() in ("TB"):
-        return int(value * 1000**4)
+    multiplier = _UNIT_MULT.get(unit.upper())
+    if multiplier is None:
+        raise ValueError(f"Unknown unit: {unit}")
     
-    raise ValueError(f"Unknown unit: {unit}")
\ No newline at end of file
+    return int(value * multiplier)
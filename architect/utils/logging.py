@@ -3,24 +3,76 @@ Logging configuration utilities.
 
 This module provides functions for setting up and configuring logging.
 """
+import atexit
 import logging
+import logging.handlers
+import queue
 from typing import Optional
 
+# Writes the queued records to the console from a background thread
+_listener: Optional[logging.handlers.QueueListener] = None
+
 
 def setup_logging(debug: bool = False) -> None:
     """
     Configure logging for the application.
     
+    Log calls only put their record on a queue; a listener thread formats and
+    writes them, so console I/O stays off the calling threads.
+    
     Args:
         debug: Whether to enable debug logging
     """
+    global _listener
+    
     level = logging.DEBUG if debug else logging.INFO
     
-    logging.basicConfig(
-        level=level,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    if _listener is None:
+        # The format does not show process or thread details, so skip
+        # collecting them for every record
+        logging.logProcesses = False
+        logging.logThreads = False
+        logging.logMultiprocessing = False
+        
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(
+            fmt='{asctime} - {levelname} - {message}',
+            datefmt='%Y-%m-%d %H:%M:%S',
+            style='{'
+        ))
+        
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        # Only merge the message arguments here, the listener applies the format
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        
+        logging.basicConfig(level=level, handlers=[queue_handler])
+        
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_logging)
     
     logger = logging.getLogger('architect')
     logger.setLevel(level)
+
+
+def flush_logging() -> None:
+    """
+    Wait until every queued log record has been written.
+    
+    Call this before writing to the console directly, so that the output
+    stays in order with the log messages.
+    """
+    if _listener is not None:
+        # Stopping drains the queue; restart to keep handling new records
+        _listener.stop()
+        _listener.start()
+
+
+def _stop_logging() -> None:
+    """Write the remaining log records and stop the listener thread."""
+    global _listener
+    
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
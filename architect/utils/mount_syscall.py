@@ -0,0 +1,96 @@
+"""
+Direct mount system call module.
+
+This module mounts filesystems by calling mount(2) through the C library,
+instead of spawning a mount process for every filesystem.
+"""
+import ctypes
+import functools
+import os
+from typing import Tuple
+
+# Mount flags (see linux/mount.h)
+MS_RDONLY = 1
+MS_NOSUID = 2
+MS_NODEV = 4
+MS_NOEXEC = 8
+MS_SYNCHRONOUS = 16
+MS_NOATIME = 1024
+MS_NODIRATIME = 2048
+MS_RELATIME = 1 << 21
+
+# Mount options translated to mount flags
+MOUNT_FLAGS = {
+    "ro": MS_RDONLY,
+    "nosuid": MS_NOSUID,
+    "nodev": MS_NODEV,
+    "noexec": MS_NOEXEC,
+    "sync": MS_SYNCHRONOUS,
+    "noatime": MS_NOATIME,
+    "nodiratime": MS_NODIRATIME,
+    "relatime": MS_RELATIME,
+}
+
+# Options that only mean something to mount(8) and fstab, or that select the
+# kernel defaults, and must not be passed to the filesystem
+IGNORED_OPTIONS = {"defaults", "rw", "suid", "dev", "exec", "async", "auto", "noauto", "nofail"}
+
+
+@functools.lru_cache(maxsize=None)
+def _libc() -> ctypes.CDLL:
+    """
+    Get the C library already loaded in the interpreter process.
+    
+    Returns:
+        CDLL handle exposing mount(2)
+    """
+    libc = ctypes.CDLL(None, use_errno=True)
+    libc.mount.argtypes = (ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p,
+                           ctypes.c_ulong, ctypes.c_char_p)
+    libc.mount.restype = ctypes.c_int
+    return libc
+
+
+def parse_mount_options(options: str) -> Tuple[int, str]:
+    """
+    Split a mount option string into mount flags and filesystem-specific data.
+    
+    Args:
+        options: Comma-separated mount options, as accepted by mount -o
+    
+    Returns:
+        Tuple of (mount flags, comma-separated filesystem options)
+    """
+    flags = 0
+    data = []
+    for option in options.split(","):
+        if not option or option in IGNORED_OPTIONS or option.lower().startswith("x-"):
+            continue
+        flag = MOUNT_FLAGS.get(option)
+        if flag is not None:
+            flags |= flag
+        else:
+            data.append(option)
+    
+    return flags, ",".join(data)
+
+
+def mount(source: str, target: str, fstype: str, options: str) -> None:
+    """
+    Mount a filesystem with the mount(2) system call.
+    
+    Args:
+        source: Device to mount
+        target: Directory to mount the filesystem on
+        fstype: Filesystem type (vfat, ext4, btrfs, ...)
+        options: Comma-separated mount options, as accepted by mount -o
+    
+    Raises:
+        OSError: If the system call fails
+    """
+    flags, data = parse_mount_options(options)
+    
+    if _libc().mount(os.fsencode(source), os.fsencode(target), fstype.encode(),
+                     flags, data.encode() if data else None) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"{os.strerror(errno)}: {source} on {target}")
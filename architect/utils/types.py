@@ -15,6 +15,7 @@ class DiskInfo(TypedDict):
     nvme: bool
     model: str
     trim_supported: bool
+    discarded: bool
     cpu_count: int
 
 
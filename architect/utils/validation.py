@@ -5,15 +5,32 @@ This module provides functions for validating prerequisites and arguments.
 """
 import os
 import re
-import shutil
 import logging
-import argparse
-from typing import List, Any
+from typing import List, Any, Optional, Tuple
 
-from architect.utils.command import CommandRunner, SimulationMode
+from architect.utils.command import CommandRunner, find_tool
 
 logger = logging.getLogger('architect')
 
+# Required tools for normal operation
+REQUIRED_TOOLS = (
+    "parted", "mkfs.fat", "mkfs.ext4", "mkfs.btrfs", "btrfs",
+    "cryptsetup", "blkid", "mount", "umount", "wipefs"
+)
+
+# Tools required for real disk info detection
+REAL_DISK_DETECTION_TOOLS = (
+    "lsblk",       # For getting disk size, type, model and discard support
+)
+
+# Optional tools for advanced features
+RECOMMENDED_TOOLS = (
+    "hdparm",   # TRIM detection for SATA SSDs when lsblk fails and sysfs has no discard limits
+)
+
+# Matches the major.minor.patch version printed by cryptsetup --version
+_CRYPTSETUP_VERSION_RE = re.compile(r'(\d+)\.(\d+)\.(\d+)')
+
 
 def check_prerequisites(cmd_runner: CommandRunner, use_real_disk_info: bool = False) -> None:
     """
@@ -27,55 +44,35 @@ def check_prerequisites(cmd_runner: CommandRunner, use_real_disk_info: bool = Fa
         RuntimeError: If prerequisites are not met
     """
     # Determine if we need to check real prerequisites (either not simulating or using real disk info)
-    check_real_prerequisites = (cmd_runner.simulation_mode != SimulationMode.SIMULATE) or use_real_disk_info
+    check_real_prerequisites = not cmd_runner.simulating or use_real_disk_info
     
     # Check if running as root when necessary
     if check_real_prerequisites and os.geteuid() != 0:
         # Different messages based on simulation mode
-        if cmd_runner.simulation_mode == SimulationMode.SIMULATE:
+        if cmd_runner.simulating:
             raise RuntimeError("Root privileges required with --sim-use-real to access disk information")
         else:
             raise RuntimeError("This script must be run as root")
     
-    # Required tools for normal operation
-    required_tools = [
-        "parted", "mkfs.fat", "mkfs.ext4", "mkfs.btrfs", "btrfs",
-        "cryptsetup", "blkid", "mount", "umount", "wipefs"
-    ]
-    
-    # Tools required for real disk info detection
-    real_disk_detection_tools = [
-        "blockdev",    # For getting disk size
-        "lsblk"        # For checking disk type and model
-    ]
-    
-    # Optional tools for advanced features
-    recommended_tools = [
-        "hdparm",   # For TRIM detection on SATA drives
-    ]
-    
     # Add tools needed for real disk info detection if applicable
-    if check_real_prerequisites:
-        required_tools.extend(real_disk_detection_tools)
+    required_tools = REQUIRED_TOOLS + REAL_DISK_DETECTION_TOOLS if check_real_prerequisites else REQUIRED_TOOLS
+    recommended_tools = RECOMMENDED_TOOLS
     
     # In pure simulation mode (without real disk info), just log what would be checked
-    if cmd_runner.simulation_mode == SimulationMode.SIMULATE and not use_real_disk_info:
-        logger.info("Checking for required tools (simulated)")
-        for tool in required_tools:
-            logger.info(f"Tool '{tool}' would be checked")
-        for tool in recommended_tools:
-            logger.info(f"Optional tool '{tool}' would be checked")
+    if cmd_runner.simulating and not use_real_disk_info:
+        logger.info("Checking for required tools (simulated): %s", ", ".join(required_tools))
+        logger.info("Optional tools (simulated): %s", ", ".join(recommended_tools))
         return
     
     # Actually check for required tools
     missing_tools = []
     for tool in required_tools:
-        if not shutil.which(tool):
+        if not find_tool(tool):
             missing_tools.append(tool)
     
     if missing_tools:
         # Different messages based on simulation mode
-        if cmd_runner.simulation_mode == SimulationMode.SIMULATE:
+        if cmd_runner.simulating:
             raise RuntimeError(
                 f"Missing required tools for --sim-use-real: {', '.join(missing_tools)}\n"
                 "These tools are needed to access real disk information even in simulation mode.\n"
@@ -90,7 +87,7 @@ def check_prerequisites(cmd_runner: CommandRunner, use_real_disk_info: bool = Fa
     # Check for optional tools and warn if missing
     missing_optional = []
     for tool in recommended_tools:
-        if not shutil.which(tool):
+        if not find_tool(tool):
             missing_optional.append(tool)
     
     if missing_optional:
@@ -110,6 +107,48 @@ def check_prerequisites(cmd_runner: CommandRunner, use_real_disk_info: bool = Fa
         logger.warning(msg)
 
 
+def _parse_cryptsetup_version(version_str: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Parse the version printed by cryptsetup --version.
+    
+    Args:
+        version_str: Output of cryptsetup --version (e.g. "cryptsetup 2.6.1 flags: ...")
+        
+    Returns:
+        Tuple of (major, minor, patch), or None if no version was found
+    """
+    # The output starts with "cryptsetup <major>.<minor>.<patch>", so string
+    # methods are enough; the regex only handles unusual formats
+    words = version_str.split(None, 2)
+    if len(words) > 1:
+        parts = words[1].split(".")
+        if len(parts) == 3 and all(part.isascii() and part.isdigit() for part in parts):
+            return int(parts[0]), int(parts[1]), int(parts[2])
+    
+    version_match = _CRYPTSETUP_VERSION_RE.search(version_str)
+    if version_match:
+        major, minor, patch = map(int, version_match.groups())
+        return major, minor, patch
+    return None
+
+
+def _hardware_encryption_options(args: Any) -> Tuple[Any, Any, Any]:
+    """
+    Get the hardware encryption options, None for those that are not defined.
+    
+    Args:
+        args: Command line arguments
+        
+    Returns:
+        Tuple of (PSID, admin password, encryption password)
+    """
+    return (
+        getattr(args, 'hardware_encryption_psid', None),
+        getattr(args, 'hardware_encryption_admin', None),
+        getattr(args, 'hardware_encryption_pass', None)
+    )
+
+
 def normalize_encryption_args(args: Any) -> None:
     """
     Normalize encryption arguments to handle both old and new formats.
@@ -118,13 +157,10 @@ def normalize_encryption_args(args: Any) -> None:
         args: Command line arguments
     """
     # Handle the new encryption argument format
-    if hasattr(args, 'hardware_encryption_psid') and hasattr(args, 'hardware_encryption_admin') and hasattr(args, 'hardware_encryption_pass') and any([args.hardware_encryption_psid, args.hardware_encryption_admin, args.hardware_encryption_pass]):
+    psid, admin, password = _hardware_encryption_options(args)
+    if psid or admin or password:
         # Convert to the legacy format for compatibility with the rest of the code
-        args.hardware_encryption = (
-            args.hardware_encryption_psid or "none",
-            args.hardware_encryption_admin or "",
-            args.hardware_encryption_pass or ""
-        )
+        args.hardware_encryption = (psid or "none", admin or "", password or "")
 
 
 def validate_encryption_requirements(args: Any, cmd_runner: CommandRunner) -> None:
@@ -141,24 +177,22 @@ def validate_encryption_requirements(args: Any, cmd_runner: CommandRunner) -> No
     from architect.core.exceptions import EncryptionError
     
     # Check cryptsetup version if encryption is requested
-    if hasattr(args, 'hardware_encryption') and hasattr(args, 'software_encryption') and (args.hardware_encryption or args.software_encryption or any([
-        getattr(args, 'hardware_encryption_psid', None),
-        getattr(args, 'hardware_encryption_admin', None),
-        getattr(args, 'hardware_encryption_pass', None)
-    ])):
+    hardware_encryption = getattr(args, 'hardware_encryption', None)
+    psid, admin, password = _hardware_encryption_options(args)
+    if hardware_encryption or getattr(args, 'software_encryption', None) or psid or admin or password:
         try:
             result = cmd_runner.run(["cryptsetup", "--version"], check=False)
             version_str = result.stdout.strip()
-            version_match = re.search(r'(\d+)\.(\d+)\.(\d+)', version_str)
+            version = _parse_cryptsetup_version(version_str)
             
-            if version_match:
-                major, minor, patch = map(int, version_match.groups())
-                if (args.hardware_encryption or getattr(args, 'hardware_encryption_pass', None)) and (major < 2 or (major == 2 and minor < 6)):
+            if version:
+                major, minor, patch = version
+                if (hardware_encryption or password) and (major < 2 or (major == 2 and minor < 6)):
                     raise EncryptionError(
                         f"Opal hardware encryption requires cryptsetup 2.6.0 or newer.\n"
                         f"Found version: {version_str}\n"
                         "Please upgrade cryptsetup and try again."
                     )
         except Exception as e:
-            logger.warning(f"Could not check cryptsetup version: {e}")
+            logger.warning("Could not check cryptsetup version: %s", e)
             logger.warning("Continuing anyway, but hardware encryption might fail")